@@ -0,0 +1,259 @@
+import io
+import json
+import tarfile
+import time
+from argparse import ArgumentParser
+
+from .compress import COMPRESSION_LEVEL, COMPRESSION_WORKERS, BlockCompressor, compressions
+from .graph import DGRAPH_ADDRESS, close_graph_connection, open_graph_connection, page_nodes, quote
+from .pipeline import Prefetcher
+
+BACKUP_PAGE_SIZE = 1000
+BACKUP_QUEUE_SIZE = 4
+
+backup_types = ('Script', 'Language', 'Alphabet', 'Expression', 'Transliteration')
+
+# Data types N-Quads need spelled out; strings are the default.
+literal_types = {
+    bool: 'xs:boolean',
+    int: 'xs:int',
+    float: 'xs:float',
+}
+
+
+def get_schema(client) -> str:
+    # Rebuilds the schema of every predicate and type outside Dgraph's own,
+    # so a backup can be restored into an empty cluster.
+    transaction = client.txn(read_only=True)
+
+    try:
+        response = json.loads(transaction.query('schema {}').json.decode('utf-8'))
+    finally:
+        transaction.discard()
+
+    lines = []
+
+    for predicate in response.get('schema', []):
+        if predicate['predicate'].startswith('dgraph.'):
+            continue
+
+        value_type = f'[{predicate["type"]}]' if predicate.get('list') else predicate['type']
+        directives = ''
+
+        if predicate.get('index'):
+            directives += f' @index({", ".join(predicate.get("tokenizer", []))})'
+
+        for directive in ('upsert', 'count', 'reverse'):
+            if predicate.get(directive):
+                directives += f' @{directive}'
+
+        lines.append(f'{predicate["predicate"]}: {value_type}{directives} .')
+
+    for node_type in response.get('types', []):
+        if node_type['name'].startswith('dgraph.'):
+            continue
+
+        fields = ''.join(f'\n    {field["name"]}' for field in node_type.get('fields', []))
+        lines.append(f'type {node_type["name"]} {{{fields}\n}}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def to_object(value) -> str:
+    if isinstance(value, dict):
+        return f'_:{value["uid"]}'
+
+    if type(value) in literal_types:
+        return f'{quote(json.dumps(value))}^^<{literal_types[type(value)]}>'
+
+    return quote(value)
+
+
+def to_nquads(node: dict) -> str:
+    # UIDs become blank nodes, so the backup can be loaded into any cluster.
+    subject = f'_:{node["uid"]}'
+    lines = []
+
+    for predicate, values in node.items():
+        if predicate == 'uid':
+            continue
+
+        for value in values if isinstance(values, list) else [values]:
+            lines.append(f'{subject} <{predicate}> {to_object(value)} .\n')
+
+    return ''.join(lines)
+
+
+def to_blank_uids(value):
+    if isinstance(value, list):
+        return [to_blank_uids(item) for item in value]
+
+    if isinstance(value, dict):
+        return {
+            key: f'_:{item}' if key == 'uid' else to_blank_uids(item)
+            for key, item in value.items()
+        }
+
+    return value
+
+
+def to_json_line(node: dict) -> str:
+    # Nodes are written as JSON Lines, with the nodes they point to nested
+    # inline, and UIDs become blank nodes like in RDF backups.
+    return json.dumps(to_blank_uids(node), ensure_ascii=False) + '\n'
+
+
+# The fields read for every node, how a node is written out, the extension
+# of each page and the types backed up. JSON backups nest transliterations
+# in the nodes that use them instead of listing them separately.
+backup_formats = {
+    'rdf': (
+        'uid dgraph.type expand(_all_) { uid }',
+        to_nquads,
+        'rdf',
+        backup_types,
+    ),
+    'json': (
+        'uid dgraph.type expand(_all_) { uid dgraph.type expand(_all_) }',
+        to_json_line,
+        'jsonl',
+        tuple(node_type for node_type in backup_types if node_type != 'Transliteration'),
+    ),
+}
+
+
+def read_pages(client, node_type: str, page_size: int = BACKUP_PAGE_SIZE, backup_format: str = 'rdf'):
+    # Every type is read on its own read-only transaction, so its pages all
+    # come from one snapshot, and serialized on the same thread.
+    fields, serialize, _, _ = backup_formats[backup_format]
+    transaction = client.txn(read_only=True)
+
+    try:
+        for nodes in page_nodes(client, node_type, fields, page_size, transaction):
+            if nodes:
+                yield len(nodes), ''.join(serialize(node) for node in nodes).encode('utf-8')
+    finally:
+        transaction.discard()
+
+
+def add_member(archive: tarfile.TarFile, name: str, data: bytes):
+    member = tarfile.TarInfo(name)
+    member.size = len(data)
+    member.mtime = int(time.time())
+    archive.addfile(member, io.BytesIO(data))
+
+
+def write_backup(
+    client,
+    path: str,
+    page_size: int = BACKUP_PAGE_SIZE,
+    queue_size: int = BACKUP_QUEUE_SIZE,
+    backup_format: str = 'rdf',
+    compression: str = 'gzip',
+    level: int = COMPRESSION_LEVEL,
+    workers: int = COMPRESSION_WORKERS,
+):
+    # Each page becomes its own archive member, which is what lets the
+    # archive be streamed without knowing how big each type is up front.
+    # Every type is paged in parallel and written out in turn, with at most
+    # `queue_size` pages per type waiting in memory. The archive itself is
+    # compressed in blocks on `workers` threads.
+    _, _, extension, node_types = backup_formats[backup_format]
+    readers = [
+        Prefetcher(node_type, read_pages(client, node_type, page_size, backup_format), queue_size)
+        for node_type in node_types
+    ]
+
+    try:
+        with open(path, 'wb') as output, \
+                BlockCompressor(output, compression, level, workers) as compressor, \
+                tarfile.open(fileobj=compressor, mode='w|') as archive:
+            add_member(archive, 'schema.dgraph', get_schema(client).encode('utf-8'))
+
+            for reader in readers:
+                total = 0
+
+                for page, (count, data) in enumerate(reader):
+                    add_member(archive, f'{reader.name}/{page:06d}.{extension}', data)
+                    total += count
+
+                print(f'Backed up {total:,} {reader.name} nodes.')
+    finally:
+        for reader in readers:
+            reader.stop()
+
+
+def backup(
+    path,
+    addresses=None,
+    page_size=BACKUP_PAGE_SIZE,
+    backup_format='rdf',
+    compression='gzip',
+    level=COMPRESSION_LEVEL,
+    workers=COMPRESSION_WORKERS,
+):
+    stubs, client = open_graph_connection(addresses or (DGRAPH_ADDRESS,))
+
+    try:
+        print(f'Backing up Dgraph to {path} as {backup_format.upper()}, compressed with {compression}...')
+        write_backup(
+            client,
+            path,
+            page_size,
+            backup_format=backup_format,
+            compression=compression,
+            level=level,
+            workers=workers,
+        )
+    except Exception as error:
+        print(f'Could not back up Dgraph to "{path}":', error)
+        return 1
+    finally:
+        close_graph_connection(stubs, client)
+
+    return 0
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Stream a backup of the graph into a compressed archive.')
+    parser.add_argument('path', help='archive to write, e.g. doraboateng.rdf.tar.gz')
+    parser.add_argument(
+        '--alpha',
+        action='append',
+        dest='addresses',
+        help=f'Dgraph alpha address, can be repeated (default: {DGRAPH_ADDRESS})',
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(backup_formats),
+        default='rdf',
+        dest='backup_format',
+        help='write N-Quads, or JSON Lines with transliterations nested in their nodes (default: rdf)',
+    )
+    parser.add_argument(
+        '--page-size',
+        default=BACKUP_PAGE_SIZE,
+        type=int,
+        help=f'nodes read per query and written per archive member (default: {BACKUP_PAGE_SIZE:,})',
+    )
+    parser.add_argument(
+        '--compression',
+        choices=sorted(compressions),
+        default='gzip',
+        help='compress the archive as gzip members or zstd frames; zstd needs the zstandard package (default: gzip)',
+    )
+    parser.add_argument(
+        '--level',
+        default=COMPRESSION_LEVEL,
+        type=int,
+        help=f'compression level (default: {COMPRESSION_LEVEL})',
+    )
+    parser.add_argument(
+        '--compress-workers',
+        default=COMPRESSION_WORKERS,
+        dest='workers',
+        type=int,
+        help=f'threads compressing blocks of the archive (default: {COMPRESSION_WORKERS}, the number of CPUs)',
+    )
+
+    exit(backup(**vars(parser.parse_args())))
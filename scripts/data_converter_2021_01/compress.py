@@ -0,0 +1,137 @@
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_BLOCK_SIZE = 4 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+COMPRESSION_WORKERS = os.cpu_count() or 1
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def compress_gzip(level: int, block: bytes) -> bytes:
+    # Every block is a complete gzip member. gunzip decompresses
+    # concatenated members as one file.
+    return gzip.compress(block, level, mtime=0)
+
+
+def compress_zstd(level: int, block: bytes) -> bytes:
+    # Every block is a complete zstd frame, and zstd decompresses
+    # concatenated frames as one file.
+    return zstandard.ZstdCompressor(level=level).compress(block)
+
+
+compressions = {
+    'gzip': compress_gzip,
+    'zstd': compress_zstd,
+}
+
+
+class BlockCompressor:
+    # A file object that cuts what's written to it into blocks and
+    # compresses them independently on a thread pool. zlib and zstd release
+    # the GIL while they work, so blocks compress on every worker at once.
+    # Compressed blocks are written out in order, with at most two blocks
+    # per worker waiting in memory.
+
+    def __init__(
+        self,
+        fileobj,
+        compression: str = 'gzip',
+        level: int = COMPRESSION_LEVEL,
+        workers: int = COMPRESSION_WORKERS,
+        block_size: int = COMPRESSION_BLOCK_SIZE,
+    ):
+        if compression == 'zstd' and not zstandard:
+            raise ValueError('zstd compression needs the zstandard package')
+
+        self.fileobj = fileobj
+        self.compress = partial(compressions[compression], level)
+        self.block_size = max(1, block_size)
+        self.buffer = bytearray()
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='compress')
+        self.pending = deque()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        if error_type:
+            self.abort()
+        else:
+            self.close()
+
+    def write(self, data) -> int:
+        self.buffer += data
+
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+
+        return len(data)
+
+    def submit(self, block: bytes):
+        self.pending.append(self.executor.submit(self.compress, block))
+
+        # Waits on the oldest block when the queue is full, and writes out
+        # whatever else is already done in order.
+        while self.pending and (len(self.pending) > 2 * self.workers or self.pending[0].done()):
+            self.fileobj.write(self.pending.popleft().result())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+
+        try:
+            if self.buffer:
+                self.submit(bytes(self.buffer))
+                self.buffer.clear()
+
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+        finally:
+            self.executor.shutdown()
+
+    def abort(self):
+        self.closed = True
+
+        for future in self.pending:
+            future.cancel()
+
+        self.pending.clear()
+        self.executor.shutdown()
+
+
+def open_compressed(path: str):
+    # Opens a gzip or zstd file for reading, whichever it is, going across
+    # the members or frames written by BlockCompressor. Python's streaming
+    # tar reader stops after the first gzip member, so archives are read
+    # through this instead.
+    with open(path, 'rb') as compressed_file:
+        magic = compressed_file.read(4)
+
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+
+    if magic == _ZSTD_MAGIC:
+        if not zstandard:
+            raise ValueError(f'{path} is compressed with zstd, which needs the zstandard package')
+
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True)
+
+    return open(path, 'rb')
@@ -1,6 +1,33 @@
 import mysql.connector
+from collections import defaultdict
+from functools import partial
+from itertools import groupby
 from mysql.connector import Error
-from uuid import uuid4
+from mysql.connector.pooling import CNX_POOL_MAXSIZE, MySQLConnectionPool
+from uuid import UUID, uuid5
+
+from .pipeline import PIPELINE_QUEUE_SIZE, Prefetcher
+from .records import Alphabet, Expression, Language, Transliteration, intern_code, intern_value
+
+FETCH_BATCH_SIZE = 1000
+
+DB_CONFIG = {
+    'host': 'dora-2017-backup-mariadb',
+    'database': 'temp',
+    'user': 'root',
+    'password': 'temp',
+}
+
+# Connections used by the alphabet, language and expression readers, and by
+# each partition of definitions (one for definitions, four for child tables).
+TABLE_CONNECTIONS = 3
+PARTITION_CONNECTIONS = 5
+
+_POOL = None
+
+# Expression UUIDs are derived from `definitions.id` in this namespace, so the
+# same definition maps to the same Expression node on every run.
+EXPRESSION_NAMESPACE = UUID('5b3c7f0e-1d0a-4c55-9a57-2f3e8d1b6a40')
 
 definition_types = {
     0: 'Word',
@@ -8,6 +35,30 @@ definition_types = {
     10: 'Expression',
 }
 
+# Tables whose watermarks are saved for incremental syncs. Titles,
+# translations and transliterations are tracked too, so editing one brings
+# its alphabet or definition along. `definition_language` has neither an ID
+# nor timestamps to track, so a change to it alone needs a full sync.
+watermark_tables = (
+    'alphabets',
+    'definitions',
+    'definition_titles',
+    'languages',
+    'translations',
+    'transliterations',
+)
+
+# Every table records are built from, to tell when the source data changed.
+source_tables = (
+    'alphabets',
+    'definition_language',
+    'definition_titles',
+    'definitions',
+    'languages',
+    'translations',
+    'transliterations',
+)
+
 parts_of_speech = {
     'adj': 'Adjective',
     'adv': 'Adverb',
@@ -25,21 +76,32 @@ def close_db_connection(conn, cursor):
     if conn and conn.is_connected():
         if cursor:
             cursor.close()
-        
+
         conn.close()
 
 
+def open_db_pool(size):
+    global _POOL
+
+    try:
+        _POOL = MySQLConnectionPool(pool_name='dora-2017-backup', pool_size=size, **DB_CONFIG)
+    except Error as err:
+        print('Could not open a MariaDB connection pool:', err)
+        return False
+
+    return True
+
+
 def open_db_connection():
     connection = None
     cursor = None
 
     try:
-        connection = mysql.connector.connect(
-            host='dora-2017-backup-mariadb',
-            database='temp',
-            user='root',
-            password='temp',
-        )
+        # Closing a pooled connection hands it back to the pool.
+        if _POOL:
+            connection = _POOL.get_connection()
+        else:
+            connection = mysql.connector.connect(**DB_CONFIG)
 
         cursor = connection.cursor()
 
@@ -49,206 +111,506 @@ def open_db_connection():
         print('Could not connect to MariaDB:', err)
 
     close_db_connection(connection, cursor)
-    
+
     return None, None
 
 
-def get_transliteration(value = None, lang = None, script = None):
+def get_transliteration(value=None, lang=None, script=None):
     if not value:
         return None
-    
+
+    return Transliteration(utf_encode(value), intern_code(lang), intern_code(script))
+
+
+def group_records(records):
+    groups = defaultdict(list)
+
+    for parent_id, *values in records:
+        groups[parent_id].append(tuple(values))
+
+    return groups
+
+
+def stream_records(cursor, query, batch_size=FETCH_BATCH_SIZE, params=None):
+    cursor.execute(query, params)
+
+    while True:
+        records = cursor.fetchmany(batch_size)
+
+        if not records:
+            break
+
+        yield from records
+
+
+def merge_records(records):
+    # Returns a lookup over child records sorted by parent ID. It must be
+    # called with increasing parent IDs, which lets it walk the stream once.
+    groups = groupby(records, key=lambda record: record[0])
+    head = next(groups, None)
+
+    def take(parent_id):
+        nonlocal head
+
+        while head is not None and head[0] < parent_id:
+            head = next(groups, None)
+
+        if head is None or head[0] != parent_id:
+            return []
+
+        values = [tuple(record[1:]) for record in head[1]]
+        head = next(groups, None)
+
+        return values
+
+    return take
+
+
+def count_records(cursor, table, changed=None, params=None):
+    if changed:
+        cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE id IN ({changed})', params)
+    else:
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+
+    return cursor.fetchone()[0]
+
+
+def get_watermark(cursor, table):
+    # Tables with an `updated_at` column are tracked by timestamp, so edited
+    # rows are picked up too; the others only by their highest ID.
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE 'updated_at'")
+    column = 'updated_at' if cursor.fetchall() else 'id'
+
+    cursor.execute(f'SELECT MAX({column}) FROM {table}')
+    value = cursor.fetchone()[0]
+
     return {
-        'value': utf_encode(value),
-        'lang_code': lang.lower() if lang and len(lang) > 0 else None,
-        'script_code': script.lower() if script and len(script) > 0 else None,
+        'column': column,
+        'value': value if value is None or isinstance(value, int) else str(value),
     }
 
 
-def fetch_alphabet_records(cursor):
-    alphabets = []
-    cursor.execute('SELECT id, code, script_code, letters FROM alphabets')
-    alphabet_records = cursor.fetchall()
-    print(f'Total alphabets in MariaDB: {cursor.rowcount:,}')
+def fetch_watermarks():
+    connection, cursor = open_db_connection()
 
-    for alphabet_id, alphabet_code, script_code, letters in alphabet_records:
-        alphabet = {
-            'code': alphabet_code.lower(),
-            'script_code': script_code.lower() if script_code else None,
-            'names': [],
-            'letters': utf_encode(letters.replace("\n", '')),
-        }
+    if not connection:
+        return None
 
-        # Pull transliterations
-        cursor.execute(
-            f'SELECT z.language, z.transliteration FROM alphabets AS a '
-            f'LEFT JOIN transliterations AS z ON z.parent_id = a.id '
-            f'WHERE z.parent_id = {alphabet_id} '
-            f"AND z.parent_type = 'App\\\\Models\\\\Alphabet'"
-        )
+    try:
+        return {table: get_watermark(cursor, table) for table in watermark_tables}
+    finally:
+        close_db_connection(connection, cursor)
+
+
+def fetch_table_stats():
+    # Stands in for the contents of every source table with its watermark
+    # and row count, which are much cheaper to read than a checksum of its
+    # rows. Rows edited in place only show if the table has an `updated_at`.
+    connection, cursor = open_db_connection()
 
-        transliteration_records = cursor.fetchall()
-
-        for lang, transliteration in transliteration_records:
-            tr = get_transliteration(transliteration, lang)
-
-            if tr is not None:
-                alphabet['names'].append(tr)
-
-        alphabets.append(alphabet)
-    
-    return alphabets
-
-
-def fetch_expression_records(cursor):
-    expressions = []
-
-    cursor.execute('SELECT id, type, sub_type, main_language_code FROM definitions')
-    definition_records = cursor.fetchall()
-    print(f'Total expressions in MariaDB: {cursor.rowcount:,}')
-
-    for def_id, def_type, def_sub_type, def_lang in definition_records:
-        expression = {
-            'type': definition_types.get(def_type, 'Word'),
-            'titles': [],
-            'languages': [],
-            'part_of_speech': parts_of_speech.get(def_sub_type, None),
-            'noun_type': None,
-            'lexeme': None,
-            'literal_translation': [],
-            'practical_translation': [],
-            'meaning': [],
-            'tags': [],
-            'related': [],
-            'references': [],
-            'uuid': uuid4().hex
+    if not connection:
+        return None
+
+    try:
+        return {
+            table: {
+                'watermark': get_watermark(cursor, table) if table in watermark_tables else None,
+                'count': count_records(cursor, table),
+            }
+            for table in source_tables
         }
+    finally:
+        close_db_connection(connection, cursor)
+
+
+def changed_rows(since, table, children=()):
+    # Returns a subquery selecting the IDs of the rows of `table` that are
+    # past their watermark, or that have child rows past theirs, along with
+    # its parameters. Returns (None, None) when the whole table must be read.
+    # Each child is a table and a query selecting the parent IDs of its rows
+    # as `w`, with a `{}` where the watermark condition goes.
+    if not since or not since.get(table) or since[table]['value'] is None:
+        return None, None
+
+    queries = []
+    params = []
+
+    for source_table, query in ((table, f'SELECT w.id FROM {table} AS w WHERE {{}}'),) + children:
+        watermark = since.get(source_table)
+
+        if not watermark or watermark['value'] is None:
+            continue
+
+        # Timestamps only have a one second resolution, so rows stamped with
+        # the watermark itself are read again rather than risk missing some.
+        operator = '>=' if watermark['column'] == 'updated_at' else '>'
+        queries.append(query.format(f'w.{watermark["column"]} {operator} %s'))
+        params.append(watermark['value'])
+
+    return ' UNION '.join(queries), tuple(params)
+
+
+def changed_alphabets(since):
+    return changed_rows(
+        since,
+        'alphabets',
+        ((
+            'transliterations',
+            'SELECT w.parent_id FROM transliterations AS w '
+            "WHERE w.parent_type = 'App\\\\Models\\\\Alphabet' AND {}",
+        ),),
+    )
+
+
+def print_total(cursor, label, table, changed, params):
+    if changed:
+        print(f'Changed {label} in MariaDB: {count_records(cursor, table, changed, params):,}')
+    else:
+        print(f'Total {label} in MariaDB: {count_records(cursor, table):,}')
+
+
+def build_alphabet(alphabet_code, script_code, letters, name_records):
+    names = []
+
+    for lang, transliteration in name_records:
+        tr = get_transliteration(transliteration, lang)
+
+        if tr is not None:
+            names.append(tr)
+
+    return Alphabet(
+        code=alphabet_code.lower(),
+        script_code=intern_code(script_code),
+        names=tuple(names),
+        letters=utf_encode(letters.replace("\n", '')),
+    )
+
+
+def fetch_alphabet_records(cursor, batch_size=FETCH_BATCH_SIZE, since=None):
+    changed, params = changed_alphabets(since)
+    where = f'WHERE a.id IN ({changed}) ' if changed else ''
+
+    # Alphabet names are few, so they're read up front and the cursor is
+    # then free to stream the alphabets themselves.
+    cursor.execute(
+        'SELECT z.parent_id, z.language, z.transliteration FROM transliterations AS z '
+        "WHERE z.parent_type = 'App\\\\Models\\\\Alphabet' "
+        + (f'AND z.parent_id IN ({changed}) ' if changed else '')
+        + 'ORDER BY z.parent_id, z.id',
+        params,
+    )
+    names = group_records(cursor.fetchall())
+
+    query = f'SELECT a.id, a.code, a.script_code, a.letters FROM alphabets AS a {where}'
+
+    for alphabet_id, alphabet_code, script_code, letters in stream_records(
+        cursor,
+        query,
+        batch_size,
+        params,
+    ):
+        yield build_alphabet(alphabet_code, script_code, letters, names.get(alphabet_id, []))
+
+
+def build_expression(
+    def_id,
+    def_type,
+    def_sub_type,
+    title_records,
+    transliterations_by_title,
+    language_records,
+    translation_records,
+):
+    titles = []
+    literal_translation = []
+    practical_translation = []
+    meaning = []
+
+    for title_id, title, script_code in title_records:
+        tr_from_title = get_transliteration(title, None, script_code)
+
+        if tr_from_title is not None:
+            titles.append(tr_from_title)
+
+        for lang, transliteration in transliterations_by_title.get(title_id, []):
+            if transliteration == title:
+                tr_title_index = titles.index(tr_from_title)
+                titles[tr_title_index] = get_transliteration(
+                    transliteration,
+                    lang,
+                    script_code,
+                )
+            else:
+                tr = get_transliteration(transliteration, lang)
+
+                if tr is not None:
+                    titles.append(tr)
+
+    # TODO: tags
+
+    for tr_lang, tr_practical, tr_literal, tr_meaning in translation_records:
+        tr = get_transliteration(tr_literal, tr_lang)
+        if tr is not None:
+            literal_translation.append(tr)
+
+        tr = get_transliteration(tr_practical, tr_lang)
+        if tr is not None:
+            practical_translation.append(tr)
+
+        tr = get_transliteration(tr_meaning, tr_lang)
+        if tr is not None:
+            meaning.append(tr)
+
+    return Expression(
+        type=definition_types.get(def_type, 'Word'),
+        titles=tuple(titles),
+        languages=tuple(intern_value(lang[0]) for lang in language_records),
+        part_of_speech=parts_of_speech.get(def_sub_type, None),
+        noun_type=None,
+        lexeme=None,
+        literal_translation=tuple(literal_translation),
+        practical_translation=tuple(practical_translation),
+        meaning=tuple(meaning),
+        tags=(),
+        related=(),
+        references=(),
+        uuid=uuid5(EXPRESSION_NAMESPACE, f'definitions.{def_id}').hex,
+        source_id=def_id,
+    )
+
+
+def changed_definitions(since):
+    # Transliterations of titles are mapped to their definition through the
+    # title they belong to.
+    return changed_rows(
+        since,
+        'definitions',
+        (
+            ('definition_titles', 'SELECT w.definition_id FROM definition_titles AS w WHERE {}'),
+            ('translations', 'SELECT w.definition_id FROM translations AS w WHERE {}'),
+            (
+                'transliterations',
+                'SELECT t.definition_id FROM transliterations AS w '
+                'INNER JOIN definition_titles AS t ON t.id = w.parent_id '
+                "WHERE w.parent_type = 'App\\\\Models\\\\DefinitionTitle' AND {}",
+            ),
+        ),
+    )
+
+
+def split_range(low, high, partitions):
+    size = max(1, -(-(high - low + 1) // partitions))
+
+    return [(start, min(start + size - 1, high)) for start in range(low, high + 1, size)]
+
+
+def fetch_expression_range(cursor, batch_size=FETCH_BATCH_SIZE, since=None, id_range=None):
+    # On incremental syncs, only the child rows of changed definitions are
+    # read, but all of them, since each expression is rewritten as a whole.
+    # A partition further limits every query to its range of definition IDs.
+    changed, params = changed_definitions(since)
+    where = f'AND {{0}} IN ({changed}) ' if changed else ''
+
+    if id_range:
+        where += 'AND {0} BETWEEN %s AND %s '
+        params = (params or ()) + tuple(id_range)
+
+    # Each child table is streamed in definition order over its own
+    # connection and merged with the definitions as they go by, so memory
+    # stays bounded and the number of queries doesn't grow with the data.
+    child_queries = (
+        'SELECT t.definition_id, t.id, t.title, a.script_code FROM definition_titles AS t '
+        'LEFT JOIN alphabets AS a ON a.id = t.alphabet_id '
+        'WHERE t.definition_id IS NOT NULL '
+        + where.format('t.definition_id')
+        + 'ORDER BY t.definition_id, t.id',
+
+        'SELECT t.definition_id, z.parent_id, z.language, z.transliteration '
+        'FROM transliterations AS z '
+        'INNER JOIN definition_titles AS t ON t.id = z.parent_id '
+        "WHERE z.parent_type = 'App\\\\Models\\\\DefinitionTitle' "
+        'AND t.definition_id IS NOT NULL '
+        + where.format('t.definition_id')
+        + 'ORDER BY t.definition_id, z.parent_id, z.id',
+
+        'SELECT p.definition_id, l.code FROM definition_language AS p '
+        'LEFT JOIN languages AS l ON l.id = p.language_id '
+        'WHERE p.definition_id IS NOT NULL '
+        + where.format('p.definition_id')
+        + 'ORDER BY p.definition_id',
+
+        'SELECT definition_id, language, practical, literal, meaning '
+        'FROM translations '
+        'WHERE definition_id IS NOT NULL '
+        + where.format('definition_id')
+        + 'ORDER BY definition_id, id',
+    )
+
+    child_connections = []
 
-        expressions.append(expression)
+    try:
+        children = []
 
-        # Pull titles for definition.
-        cursor.execute(
-            f'SELECT t.id, t.title, a.script_code FROM definition_titles AS t '
-            f'LEFT JOIN alphabets AS a ON a.id = t.alphabet_id '
-            f'WHERE t.definition_id = {def_id}'
-        )
+        for query in child_queries:
+            connection, child_cursor = open_db_connection()
 
-        title_records = cursor.fetchall()
+            if not connection:
+                raise Error('Could not open a MariaDB connection for child records.')
 
-        for title_id, title, script_code in title_records:
-            tr_from_title = get_transliteration(title, None, script_code)
+            child_connections.append((connection, child_cursor))
+            children.append(merge_records(stream_records(child_cursor, query, batch_size, params)))
 
-            if tr_from_title is not None:
-                expression['titles'].append(tr_from_title)
+        take_titles, take_transliterations, take_languages, take_translations = children
+        query = (
+            'SELECT id, type, sub_type, main_language_code FROM definitions '
+            'WHERE id IS NOT NULL '
+            + where.format('id')
+            + 'ORDER BY id'
+        )
 
-            # Pull transliterations
-            cursor.execute(
-                f'SELECT z.language, z.transliteration FROM definition_titles AS d '
-                f'LEFT JOIN transliterations AS z ON z.parent_id = d.id '
-                f'WHERE z.parent_id = {title_id} '
-                f"AND z.parent_type = 'App\\\\Models\\\\DefinitionTitle'"
+        for def_id, def_type, def_sub_type, def_lang in stream_records(
+            cursor,
+            query,
+            batch_size,
+            params,
+        ):
+            yield build_expression(
+                def_id,
+                def_type,
+                def_sub_type,
+                take_titles(def_id),
+                group_records(take_transliterations(def_id)),
+                take_languages(def_id),
+                take_translations(def_id),
             )
-
-            transliteration_records = cursor.fetchall()
-
-            for lang, transliteration in transliteration_records:
-                if transliteration == title:
-                    tr_title_index = expression['titles'].index(tr_from_title)
-                    expression['titles'][tr_title_index] = get_transliteration(
-                        transliteration,
-                        lang,
-                        script_code,
-                    )
-                else:
-                    tr = get_transliteration(transliteration, lang)
-
-                    if tr is not None:
-                        expression['titles'].append(tr)
-
-        # Pull languages for definition.
-        cursor.execute(
-            f'SELECT l.code FROM definition_language AS p '
-            f'LEFT JOIN languages AS l ON l.id = p.language_id '
-            f'WHERE p.definition_id = {def_id}'
+    finally:
+        for connection, child_cursor in child_connections:
+            close_db_connection(connection, child_cursor)
+
+
+def fetch_expression_records(
+    cursor,
+    batch_size=FETCH_BATCH_SIZE,
+    since=None,
+    partitions=1,
+    queue_size=PIPELINE_QUEUE_SIZE,
+):
+    changed, params = changed_definitions(since)
+
+    if partitions <= 1:
+        yield from fetch_expression_range(cursor, batch_size, since)
+        return
+
+    cursor.execute('SELECT MIN(id), MAX(id) FROM definitions')
+    low, high = cursor.fetchone()
+
+    if low is None:
+        return
+
+    # Every partition is read on its own pooled connections as soon as this
+    # starts, and the partitions are then handed over one after the other,
+    # which keeps the expressions in definition order.
+    readers = [
+        Prefetcher(
+            f'expressions {start}-{end}',
+            iterate_records(partial(fetch_expression_range, id_range=(start, end)), batch_size, since),
+            queue_size,
         )
+        for start, end in split_range(low, high, partitions)
+    ]
 
-        language_records = cursor.fetchall()
-        expression['languages'] += [lang[0] for lang in language_records]
+    try:
+        for reader in readers:
+            yield from reader
+    finally:
+        for reader in readers:
+            reader.stop()
 
-        # TODO: tags
 
-        # Pull translations for definition.
-        cursor.execute(
-            f'SELECT language, practical, literal, meaning '
-            f'FROM translations '
-            f'WHERE definition_id = {def_id}'
-        )
+def build_language(lang_code, parent_code, name, alt_names):
+    names = []
 
-        translation_records = cursor.fetchall()
-
-        for tr_lang, tr_practical, tr_literal, tr_meaning in translation_records:
-            tr = get_transliteration(tr_literal, tr_lang)
-            if tr is not None:
-                expression['literal_translation'].append(tr)
-            
-            tr = get_transliteration(tr_practical, tr_lang)
-            if tr is not None:
-                expression['practical_translation'].append(tr)
-            
-            tr = get_transliteration(tr_meaning, tr_lang)
-            if tr is not None:
-                expression['meaning'].append(tr)
-        
-    return expressions
-
-
-def fetch_language_records(cursor):
-    languages = []
-    cursor.execute('SELECT code, parent_code, name, alt_names FROM languages')
-    language_records = cursor.fetchall()
-    print(f'Total languages in MariaDB: {cursor.rowcount:,}')
-
-    for lang_code, parent_code, name, alt_names  in language_records:
-        language = {
-            'code': lang_code,
-            'parent_code': parent_code or None,
-            'names': [],
-        }
+    for name in [name] + (alt_names or '').split(','):
+        name = utf_encode(name).strip()
+
+        if len(name) > 0:
+            names.append(Transliteration(name))
 
-        names = [name] + (alt_names or '').split(',')
+    return Language(
+        code=intern_value(lang_code),
+        parent_code=intern_value(parent_code) or None,
+        names=tuple(names),
+    )
 
-        for name in names:
-            name = utf_encode(name).strip()
 
-            if len(name) > 0:
-                language['names'].append({
-                    'value': name,
-                    'lang_code': None,
-                    'script_code': None,
-                })
+def fetch_language_records(cursor, batch_size=FETCH_BATCH_SIZE, since=None):
+    changed, params = changed_rows(since, 'languages')
+    query = (
+        'SELECT code, parent_code, name, alt_names FROM languages '
+        + (f'WHERE id IN ({changed})' if changed else '')
+    )
 
-        languages.append(language)
-    
-    return languages
+    for lang_code, parent_code, name, alt_names in stream_records(
+        cursor,
+        query,
+        batch_size,
+        params,
+    ):
+        yield build_language(lang_code, parent_code, name, alt_names)
 
 
-def fetch_all():
+def iterate_records(fetch_records, batch_size=FETCH_BATCH_SIZE, since=None, **options):
     connection, cursor = open_db_connection()
 
     if not connection:
-        return None
-    
-    result = None
-    
+        raise Error('Could not connect to MariaDB.')
+
     try:
-        result = {
-            'alphabets': fetch_alphabet_records(cursor),
-            'expressions': fetch_expression_records(cursor),
-            'languages': fetch_language_records(cursor),
-            'stories': [],
-        }
+        yield from fetch_records(cursor, batch_size, since, **options)
     except Exception as error:
         print('Error while fetching data from MariaDB:', error)
-    
-    close_db_connection(connection, cursor)
+        raise
+    finally:
+        close_db_connection(connection, cursor)
+
+
+def fetch_all(batch_size=FETCH_BATCH_SIZE, since=None, workers=1, queue_size=PIPELINE_QUEUE_SIZE):
+    # With several workers, definitions are split into that many ID ranges,
+    # as far as the pool size allows.
+    partitions = max(1, min(workers, (CNX_POOL_MAXSIZE - TABLE_CONNECTIONS) // PARTITION_CONNECTIONS))
+
+    if partitions > 1 and not open_db_pool(TABLE_CONNECTIONS + partitions * PARTITION_CONNECTIONS):
+        return None
 
-    return result
+    connection, cursor = open_db_connection()
+
+    if not connection:
+        return None
+
+    # Totals are counted here, before the tables may be read on threads of
+    # their own, so they're printed in order.
+    try:
+        print_total(cursor, 'alphabets', 'alphabets', *changed_alphabets(since))
+        print_total(cursor, 'expressions', 'definitions', *changed_definitions(since))
+        print_total(cursor, 'languages', 'languages', *changed_rows(since, 'languages'))
+    finally:
+        close_db_connection(connection, cursor)
+
+    # Each table is read lazily over its own connection, in batches of
+    # `batch_size` rows, as the loader consumes it. Given the watermarks of
+    # a previous sync, only the rows changed since are read.
+    data = {
+        'alphabets': iterate_records(fetch_alphabet_records, batch_size, since),
+        'expressions': iterate_records(
+            fetch_expression_records,
+            batch_size,
+            since,
+            partitions=partitions,
+            queue_size=queue_size,
+        ),
+        'languages': iterate_records(fetch_language_records, batch_size, since),
+    }
+
+    data['stories'] = []
+
+    return data
@@ -0,0 +1,65 @@
+import json
+import sqlite3
+from hashlib import sha256
+from threading import Lock
+from typing import Union
+
+
+def get_record_hash(record) -> str:
+    return sha256(bytes(json.dumps(record, sort_keys=True, default=str), 'utf-8')).hexdigest()
+
+
+class RecordHashes:
+    # Remembers a content hash for every record that was committed to Dgraph,
+    # keyed by stage and natural key, so a later sync can tell which records
+    # changed since and only write those.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS record_hashes ('
+            'stage TEXT NOT NULL, '
+            'key TEXT NOT NULL, '
+            'hash TEXT NOT NULL, '
+            'PRIMARY KEY (stage, key)'
+            ') WITHOUT ROWID'
+        )
+        self.db.commit()
+
+    def get(self, stage: str, key: str) -> Union[str, None]:
+        with self.lock:
+            row = self.db.execute(
+                'SELECT hash FROM record_hashes WHERE stage = ? AND key = ?',
+                (stage, key),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def set_many(self, stage: str, hashes: list):
+        if not hashes:
+            return
+
+        with self.lock:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO record_hashes (stage, key, hash) VALUES (?, ?, ?)',
+                [(stage, key, record_hash) for key, record_hash in hashes],
+            )
+            self.db.commit()
+
+    def sample(self, size: int) -> list:
+        with self.lock:
+            return self.db.execute(
+                'SELECT stage, key FROM record_hashes ORDER BY RANDOM() LIMIT ?',
+                (size,),
+            ).fetchall()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute('DELETE FROM record_hashes')
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
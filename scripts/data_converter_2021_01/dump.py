@@ -0,0 +1,238 @@
+import mmap
+import re
+from collections import defaultdict
+
+from .db import (
+    build_alphabet,
+    build_expression,
+    build_language,
+    group_records,
+)
+
+_STATEMENT = re.compile(
+    rb'^(?:INSERT INTO `(\w+)`(?: \(([^)]*)\))? VALUES |CREATE TABLE `(\w+)` \()',
+    re.MULTILINE,
+)
+_COLUMN = re.compile(rb'^\s+`(\w+)` ', re.MULTILINE)
+_VALUE = re.compile(
+    rb"\s*(?:'([^'\\]*(?:(?:\\.|'')[^'\\]*)*)'|(NULL)|([-+0-9.eE]+))\s*([,)])",
+    re.DOTALL,
+)
+_ESCAPE = re.compile(r"\\(.)|''", re.DOTALL)
+_ESCAPES = {
+    '0': '\0',
+    'b': '\b',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'Z': '\x1a',
+}
+
+
+def unescape(value):
+    return _ESCAPE.sub(
+        lambda match: _ESCAPES.get(match.group(1), match.group(1)) if match.group(1) else "'",
+        value,
+    )
+
+
+def to_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+class DumpFile:
+    # Memory-maps a mysqldump file and indexes where each table's columns
+    # and INSERT statements are, so tables can later be read in any order
+    # without loading the file into memory.
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.columns = {}
+        self.inserts = defaultdict(list)
+
+        for match in _STATEMENT.finditer(self.buffer):
+            insert_table, insert_columns, create_table = match.groups()
+
+            if create_table:
+                end = self.buffer.find(b'\n)', match.end())
+                self.columns[create_table.decode()] = [
+                    column.decode() for column in _COLUMN.findall(self.buffer, match.end(), end)
+                ]
+            else:
+                columns = None
+
+                if insert_columns:
+                    columns = [column.strip(b' `').decode() for column in insert_columns.split(b',')]
+
+                self.inserts[insert_table.decode()].append((match.end(), columns))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def parse_rows(self, offset):
+        # Yields the tuples of a single INSERT statement starting at `offset`.
+        buffer = self.buffer
+
+        while True:
+            offset = buffer.find(b'(', offset) + 1
+            row = []
+
+            while True:
+                match = _VALUE.match(buffer, offset)
+
+                if not match:
+                    raise ValueError(f'Could not parse {self.path} at byte {offset:,}.')
+
+                string, null, number, delimiter = match.groups()
+
+                if string is not None:
+                    row.append(unescape(string.decode('utf-8')))
+                elif null:
+                    row.append(None)
+                else:
+                    row.append(to_number(number.decode()))
+
+                offset = match.end()
+
+                if delimiter == b')':
+                    break
+
+            yield row
+
+            while buffer[offset:offset + 1].isspace():
+                offset += 1
+
+            if buffer[offset:offset + 1] != b',':
+                return
+
+    def read_table(self, table, columns):
+        for offset, insert_columns in self.inserts.get(table, []):
+            names = insert_columns or self.columns.get(table)
+
+            if not names:
+                raise ValueError(f'No column names found for table "{table}" in {self.path}.')
+
+            indices = [names.index(column) for column in columns]
+
+            for row in self.parse_rows(offset):
+                yield tuple(row[index] for index in indices)
+
+
+def read_transliterations(dump, parent_type):
+    for parent_id, row_parent_type, language, transliteration in dump.read_table(
+        'transliterations',
+        ('parent_id', 'parent_type', 'language', 'transliteration'),
+    ):
+        if row_parent_type == parent_type:
+            yield parent_id, language, transliteration
+
+
+def read_alphabet_records(dump):
+    names = group_records(read_transliterations(dump, 'App\\Models\\Alphabet'))
+
+    for alphabet_id, alphabet_code, script_code, letters in dump.read_table(
+        'alphabets',
+        ('id', 'code', 'script_code', 'letters'),
+    ):
+        yield build_alphabet(alphabet_code, script_code, letters, names.get(alphabet_id, []))
+
+
+def read_expression_records(dump):
+    # The dump isn't sorted by definition, so child tables are grouped in
+    # memory first and definitions are then streamed past them.
+    script_codes = dict(dump.read_table('alphabets', ('id', 'script_code')))
+    language_codes = dict(dump.read_table('languages', ('id', 'code')))
+
+    titles = group_records(
+        (definition_id, title_id, title, script_codes.get(alphabet_id))
+        for title_id, definition_id, title, alphabet_id in dump.read_table(
+            'definition_titles',
+            ('id', 'definition_id', 'title', 'alphabet_id'),
+        )
+    )
+    transliterations = group_records(read_transliterations(dump, 'App\\Models\\DefinitionTitle'))
+    languages = group_records(
+        (definition_id, language_codes.get(language_id))
+        for definition_id, language_id in dump.read_table(
+            'definition_language',
+            ('definition_id', 'language_id'),
+        )
+    )
+    translations = group_records(dump.read_table(
+        'translations',
+        ('definition_id', 'language', 'practical', 'literal', 'meaning'),
+    ))
+
+    for def_id, def_type, def_sub_type in dump.read_table(
+        'definitions',
+        ('id', 'type', 'sub_type'),
+    ):
+        yield build_expression(
+            def_id,
+            def_type,
+            def_sub_type,
+            titles.get(def_id, []),
+            transliterations,
+            languages.get(def_id, []),
+            translations.get(def_id, []),
+        )
+
+
+def read_language_records(dump):
+    for lang_code, parent_code, name, alt_names in dump.read_table(
+        'languages',
+        ('code', 'parent_code', 'name', 'alt_names'),
+    ):
+        yield build_language(lang_code, parent_code, name, alt_names)
+
+
+def iterate_dump_records(dump, read_records, remaining: set):
+    try:
+        yield from read_records(dump)
+    except Exception as error:
+        print(f'Error while reading {dump.path}:', error)
+        raise
+    finally:
+        # The tables may be read on different threads; the dump is closed
+        # once the last of them is done with it.
+        remaining.discard(read_records)
+
+        if not remaining:
+            dump.close()
+
+
+def read_dump_records(dump):
+    readers = {
+        'alphabets': read_alphabet_records,
+        'expressions': read_expression_records,
+        'languages': read_language_records,
+    }
+    remaining = set(readers.values())
+    data = {table: iterate_dump_records(dump, read_records, remaining) for table, read_records in readers.items()}
+    data['stories'] = []
+
+    return data
+
+
+def read_all(path):
+    try:
+        dump = DumpFile(path)
+    except (OSError, ValueError) as error:
+        print(f'Could not open SQL dump "{path}":', error)
+        return None
+
+    print(f'Indexed {sum(len(i) for i in dump.inserts.values()):,} INSERT statements in {path}.')
+
+    return read_dump_records(dump)
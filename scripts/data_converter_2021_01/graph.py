@@ -1,9 +1,47 @@
 import json
 import pydgraph
+import random
+import re
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from hashlib import sha256
+from threading import BoundedSemaphore, Lock
 from typing import List, Union
 
-_NODE_CACHE = {}
+from .delta import RecordHashes, get_record_hash
+from .journal import JOURNAL_PATH, Journal
+from .plan import build_load_plan
+from .sizing import TARGET_LATENCY, BatchSizer
+from .uidmap import UID_MAP_CAPACITY, UidMap
+from .verify import VERIFY_PAGE_SIZE, KeyDigest, watch_keys
+
+DGRAPH_ADDRESS = 'localhost:9080'
+UPSERT_BATCH_SIZE = 500
+COMMIT_RETRIES = 5
+RETRY_BACKOFF = 0.1
+PRELOAD_PAGE_SIZE = 10000
+UID_MAP_SAMPLE_SIZE = 20
+
+# Directives that make Dgraph maintain an index for a predicate.
+_INDEX_DIRECTIVE = re.compile(r'\s*@(?:index\([^)]*\)|upsert|count|reverse)')
+
+_NODE_CACHE = UidMap()
+shared_key_names = {'code', 'hash'}
+stage_types = {
+    'scripts': 'Script',
+    'languages': 'Language',
+    'alphabets': 'Alphabet',
+    'expressions': 'Expression',
+}
+node_keys = {
+    'Alphabet': 'code',
+    'Expression': 'uuid',
+    'Language': 'code',
+    'Script': 'code',
+    'Transliteration': 'hash',
+}
 skip_expression_titles = {
     'Foo',
     'OpgNWeVydVsOulWTXz',
@@ -13,377 +51,1000 @@ skip_expression_titles = {
 }
 
 
-def open_graph_connection():
-    stub = pydgraph.DgraphClientStub('localhost:9080')
-    client = pydgraph.DgraphClient(stub)
+def open_graph_connection(addresses=(DGRAPH_ADDRESS,), stubs_per_address=1):
+    # The client picks one of its stubs at random for every transaction, so
+    # several stubs spread concurrent requests over several channels.
+    stubs = [
+        pydgraph.DgraphClientStub(address)
+        for address in addresses
+        for _ in range(max(1, stubs_per_address))
+    ]
+    client = pydgraph.DgraphClient(*stubs)
 
-    return stub, client
+    return stubs, client
 
 
-def close_graph_connection(stub, client):
-    stub.close()
+def close_graph_connection(stubs, client):
+    for stub in stubs:
+        stub.close()
 
 
 def reset():
     result = True
-    stub, client = open_graph_connection()
+    stubs, client = open_graph_connection()
 
     try:
         client.alter(pydgraph.Operation(drop_all=True))
+        _NODE_CACHE.clear()
     except Exception as error:
         result = False
         print(f'Dgraph alter "{type(error)}" error:', error)
     finally:
-        close_graph_connection(stub, client)
+        close_graph_connection(stubs, client)
 
     return result
 
 
-def upsert(
+def quote(value) -> str:
+    value = str(value) \
+        .replace('\\', '\\\\') \
+        .replace('"', '\\"') \
+        .replace('\n', '\\n') \
+        .replace('\r', '\\r') \
+        .replace('\t', '\\t')
+
+    return f'"{value}"'
+
+
+def open_uid_map(client: pydgraph.DgraphClient, path: str = None, capacity: int = UID_MAP_CAPACITY):
+    global _NODE_CACHE
+
+    _NODE_CACHE = UidMap(path, capacity)
+
+    if path and not validate_uid_map(client, _NODE_CACHE):
+        print(f'UID map {path} does not match this Dgraph cluster, clearing it.')
+        _NODE_CACHE.clear()
+
+    return _NODE_CACHE
+
+
+def validate_uid_map(
     client: pydgraph.DgraphClient,
-    node_type: str,
-    key_name: str,
-    key_value: str,
-    po_pairs: List[tuple],
-):
-    nquads = []
-    response = None
-    selector = f'eq({node_type}.{key_name}, "{key_value}")'
-    query = '{ u as node(func: ' + selector + ') { uid } }'
+    uid_map: UidMap,
+    size: int = UID_MAP_SAMPLE_SIZE,
+) -> bool:
+    # Checks a random sample of stored UIDs against the graph. After a
+    # drop_all (or against another cluster) those UIDs no longer carry the
+    # same keys, and the whole map is invalid.
+    sample = uid_map.sample(size)
 
-    po_pairs.append((key_name, f'"{key_value}"'))
+    if not sample:
+        return True
+
+    predicates = ' '.join(f'{node_type}.{key_name}' for node_type, key_name in node_keys.items())
+    transaction = client.txn(read_only=True)
+
+    try:
+        response = transaction.query(
+            f'{{ nodes(func: uid({", ".join(uid for _, _, uid in sample)})) {{ uid {predicates} }} }}'
+        )
+    finally:
+        transaction.discard()
+
+    nodes = {node['uid']: node for node in json.loads(response.json.decode('utf-8')).get('nodes', [])}
+
+    for node_type, key_value, uid in sample:
+        if nodes.get(uid, {}).get(f'{node_type}.{node_keys.get(node_type)}') != key_value:
+            return False
+
+    return True
+
+
+def validate_record_hashes(
+    client: pydgraph.DgraphClient,
+    record_hashes: RecordHashes,
+    size: int = UID_MAP_SAMPLE_SIZE,
+) -> bool:
+    # Checks that a random sample of the records hashed by earlier syncs is
+    # in the graph. After a drop_all (or against another cluster) they're
+    # gone, and every record has to be written again.
+    sample = [(stage, key) for stage, key in record_hashes.sample(size) if stage in stage_types]
 
-    for i, pair in enumerate(po_pairs):
-        nquads.append(f'uid(u) <{node_type}.{pair[0]}> {pair[1]} .')
+    if not sample:
+        return True
 
-    nquads.append(f'uid(u) <dgraph.type> "{node_type}" .')
+    queries = []
+
+    for i, (stage, key) in enumerate(sample):
+        node_type = stage_types[stage]
+        queries.append(f'r{i}(func: eq({node_type}.{node_keys[node_type]}, {quote(key)}), first: 1) {{ uid }}')
+
+    transaction = client.txn(read_only=True)
 
     try:
-        transaction = client.txn()
-        mutation = transaction.create_mutation(set_nquads="\n".join(nquads))
-        request = transaction.create_request(query=query, mutations=[mutation], commit_now=True)
-        response = transaction.do_request(request)
+        response = transaction.query('{ ' + ' '.join(queries) + ' }')
     finally:
-        if transaction:
-            transaction.discard()
+        transaction.discard()
 
-    return response
+    found = json.loads(response.json.decode('utf-8'))
 
+    return all(found.get(f'r{i}') for i in range(len(sample)))
 
-def upsert_bak(
-    client,
-    node_type,
-    key_name,
-    key_value,
-    node = None,
-    selector = None,
-):
-    transaction = client.txn()
-    response = None
-    node = node or {}
-    node[key_name] = f'"{key_value}"'
-    node['dgraph.type'] = f'"{node_type}"'
-
-    if 'uid' not in node:
-        node['uid'] = f'"_:{key_value}"'
-    
-    if not selector:
-        selector = f'eq({node_type}.{key_name}, "{key_value}")'
+
+def graph_is_empty(client: pydgraph.DgraphClient) -> bool:
+    transaction = client.txn(read_only=True)
 
     try:
-        query = '{ u as node(func: ' + selector + ') { uid } }'
-        nquads = []
-
-        for key in node:
-            if key == 'uid':
-                continue
-        
-            if type(node[key]) == list:
-                for list_value in node[key]:
-                    nquads.append(f'uid(u) <{node_type}.{key}> {list_value} .')
-            else:
-                nquad_key = key if key == 'dgraph.type' else f'{node_type}.{key}'
-                nquads.append(f'uid(u) <{nquad_key}> {node[key]} .')
-
-        mutation = transaction.create_mutation(set_nquads="\n".join(nquads))
-        request = transaction.create_request(query=query, mutations=[mutation], commit_now=True)
-        response = transaction.do_request(request)
+        response = transaction.query(
+            '{ ' + ' '.join(
+                f'{node_type}(func: type({node_type}), first: 1) {{ uid }}'
+                for node_type in node_keys
+            ) + ' }'
+        )
     finally:
         transaction.discard()
-    
-    return response
 
+    return not any(json.loads(response.json.decode('utf-8')).values())
 
-def get_hash(*args):
-    return sha256(bytes('.'.join(args), 'utf-8')).hexdigest()
 
+def drop_indices(client: pydgraph.DgraphClient, indices: str):
+    # Re-declares the indexed predicates without their indexes, which Dgraph
+    # then stops maintaining until `indices` is applied again.
+    client.alter(pydgraph.Operation(schema=_INDEX_DIRECTIVE.sub('', indices)))
 
-def get_uid_from_response(response):
-    if not response:
-        print('Received invalid response in get_uid_from_response()')
-        return None
-    
-    if len(response.uids.keys()) == 1:
-        uid_key = next(iter(response.uids))
-        return response.uids[uid_key]
-    
-    if not response.json:
-        return None
-    
-    json_response = json.loads(response.json.decode('utf-8'))
 
-    if 'node' not in json_response \
-            or len(json_response['node']) != 1 \
-            or 'uid' not in json_response['node'][0] \
-            or len(json_response['node'][0]['uid']) < 1:
-        return None
-    
-    return json_response['node'][0]['uid']
+def apply_indices(client: pydgraph.DgraphClient, indices: str):
+    started = time.perf_counter()
+    client.alter(pydgraph.Operation(schema=indices))
+    print(f'Rebuilt indexes in {time.perf_counter() - started:.1f}s.')
+
+
+def get_cached_uid(node_type: str, key_value: str) -> Union[str, None]:
+    return _NODE_CACHE.get(node_type, key_value)
+
+
+def page_nodes(
+    client: pydgraph.DgraphClient,
+    node_type: str,
+    fields: str,
+    page_size: int = PRELOAD_PAGE_SIZE,
+    transaction=None,
+):
+    # Yields `fields` for every node of a type, one page at a time, so no
+    # single response holds the whole type. Given a read-only transaction,
+    # every page is read from the same snapshot.
+    after = ''
+
+    while True:
+        page_transaction = transaction or client.txn(read_only=True)
+
+        try:
+            response = page_transaction.query(
+                f'{{ nodes(func: type({node_type}), first: {page_size}{after}) {{ {fields} }} }}'
+            )
+        finally:
+            if not transaction:
+                page_transaction.discard()
 
+        nodes = json.loads(response.json.decode('utf-8')).get('nodes', [])
 
-def create_node(client, node):
-    transaction = client.txn()
-    response = None
+        yield nodes
+
+        if len(nodes) < page_size:
+            break
+
+        after = f', after: {nodes[-1]["uid"]}'
+
+
+def count_nodes(client: pydgraph.DgraphClient, node_type: str) -> int:
+    transaction = client.txn(read_only=True)
 
     try:
-        response = transaction.mutate(set_obj=node, commit_now=True)
-    except Exception as error:
-        print('create_node() error: ', error)
+        response = transaction.query(f'{{ nodes(func: type({node_type})) {{ count(uid) }} }}')
     finally:
         transaction.discard()
 
-    return get_uid_from_response(response)
+    nodes = json.loads(response.json.decode('utf-8')).get('nodes', [])
 
+    return nodes[0].get('count', 0) if nodes else 0
 
-def get_node_uid(client, node_type, code):
-    if not code or len(code) < 1:
-        return None
 
-    if node_type not in _NODE_CACHE:
-        _NODE_CACHE[node_type] = {}
+def preload_node_cache(client: pydgraph.DgraphClient, page_size: int = PRELOAD_PAGE_SIZE):
+    # Pages through the natural keys of every shared node already in the
+    # graph, so re-syncs resolve existing nodes without a lookup each.
+    for node_type, key_name in (('Language', 'code'), ('Script', 'code'), ('Transliteration', 'hash')):
+        total = 0
 
-    if code in _NODE_CACHE[node_type]:
-        return _NODE_CACHE[node_type][code]
+        for nodes in page_nodes(client, node_type, f'uid key: {node_type}.{key_name}', page_size):
+            _NODE_CACHE.set_many({
+                (node_type, node['key']): node['uid']
+                for node in nodes
+                if node.get('key')
+            })
 
-    _NODE_CACHE[node_type][code] = get_uid_from_response(upsert(
-        client,
-        node_type,
-        'code',
-        code,
-        [],
-    ))
+            total += len(nodes)
+
+        print(f'Preloaded {total:,} {node_type} UIDs.')
+
+
+def verify_graph(client: pydgraph.DgraphClient, digests: dict, page_size: int = VERIFY_PAGE_SIZE) -> bool:
+    # Compares the number of nodes of each type, and a digest of their keys,
+    # with what the source held. Only mismatches are printed.
+    mismatches = 0
+
+    for node_type, digest in digests.items():
+        key_name = node_keys[node_type]
+        total = count_nodes(client, node_type)
+        graph_digest = KeyDigest(
+            node['key']
+            for nodes in page_nodes(client, node_type, f'uid key: {node_type}.{key_name}', page_size)
+            for node in nodes
+            if node.get('key')
+        )
 
-    return _NODE_CACHE[node_type][code]
+        if total != digest.count:
+            mismatches += 1
+            print(f'Mismatch: {total:,} {node_type} nodes in graph, {digest.count:,} in source.')
+        elif graph_digest != digest:
+            mismatches += 1
+            print(f'Mismatch: {node_type}.{key_name} values differ between graph ({graph_digest}) '
+                  f'and source ({digest}).')
 
+    if not mismatches:
+        print(f'Graph matches the source for {", ".join(digests)}.')
 
-def get_transliteration_uids(client, node_type, code, transliterations):
-    uids = []
+    return not mismatches
 
-    for tr in transliterations:
-        value = tr.get('value')
-        # uid = create_node(client, tr)
 
-        for k in tr:
-            if k == 'value':
-                tr[k] = tr.get(k, '').replace('"', '\\"')
-            tr[k] = f'"{tr[k]}"'
+def create_upsert_request(transaction, blocks: List[dict], bulk: bool = False):
+    queries = []
+    mutations = []
 
-        uid = get_uid_from_response(upsert_bak(
-            client,
-            'Transliteration',
-            'hash',
-            get_hash(node_type, code, value),
-            tr,
-        ))
+    for i, block in enumerate(blocks):
+        node_type = block['node_type']
+
+        # Nodes whose UID is already known don't need to be looked up. In bulk
+        # mode every other node is new, so it's written as a blank node.
+        if block['uid']:
+            subject = f'<{block["uid"]}>'
+        elif bulk:
+            subject = f'_:n{i}'
+        else:
+            subject = f'uid(u{i})'
+            selector = f'eq({node_type}.{block["key_name"]}, {quote(block["key_value"])})'
+            queries.append(f'u{i} as q{i}(func: {selector}) {{ uid }}')
+
+        nquads = [f'{subject} <dgraph.type> "{node_type}" .']
+
+        for predicate, obj in block['po_pairs']:
+            nquads.append(f'{subject} <{node_type}.{predicate}> {obj} .')
+
+        if bulk:
+            mutations += nquads
+        else:
+            mutations.append(transaction.create_mutation(
+                set_nquads="\n".join(nquads),
+                cond=block['cond'],
+            ))
+
+    if bulk:
+        mutations = [transaction.create_mutation(set_nquads="\n".join(mutations))]
+
+    query = '{\n' + '\n'.join(queries) + '\n}' if queries else None
+
+    return transaction.create_request(query=query, mutations=mutations, commit_now=True)
+
+
+def resolve_uids(blocks: List[dict], response, bulk: bool = False) -> dict:
+    uids = {}
+    json_response = json.loads(response.json.decode('utf-8')) if response.json else {}
+
+    for i, block in enumerate(blocks):
+        uid = block['uid'] or response.uids.get(f'n{i}' if bulk else f'uid(u{i})')
+
+        if not uid and json_response.get(f'q{i}'):
+            uid = json_response[f'q{i}'][0].get('uid')
 
         if uid:
-            uids.append(f'<{uid}>')
+            uids[(block['node_type'], block['key_value'])] = uid
 
     return uids
 
 
-def transliteration_to_str(tr: Union[dict, list]) -> str:
-    if type(tr) == list:
-        return u', '.join([transliteration_to_str(t) for t in tr])
+def do_request(
+    client: pydgraph.DgraphClient,
+    create_request,
+    retries: int = COMMIT_RETRIES,
+    description: str = 'a batch',
+):
+    # Runs the request `create_request` builds for a new transaction, and
+    # retries it when Dgraph aborts it. Returns the response, the number of
+    # aborts and the latency of the attempt that went through.
+    attempt = 0
+
+    while True:
+        transaction = client.txn()
+        started = time.perf_counter()
+
+        try:
+            response = transaction.do_request(create_request(transaction))
+            break
+        except (pydgraph.AbortedError, pydgraph.RetriableError) as error:
+            if attempt >= retries:
+                raise
+
+            # Full jitter keeps workers that conflicted from retrying in step.
+            delay = random.uniform(0, RETRY_BACKOFF * 2 ** attempt)
+            attempt += 1
+            print(f'Dgraph aborted {description} ({error}), retry {attempt} in {delay:.2f}s.')
+            time.sleep(delay)
+        finally:
+            transaction.discard()
+
+    return response, attempt, time.perf_counter() - started
 
-    return f'{tr["Transliteration.value"]} ({tr["Transliteration.hash"][:6]})'
 
+def commit_blocks(
+    client: pydgraph.DgraphClient,
+    blocks: List[dict],
+    retries: int = COMMIT_RETRIES,
+    bulk: bool = False,
+    sizer: BatchSizer = None,
+    generation: int = None,
+) -> dict:
+    response, aborts, latency = do_request(
+        client,
+        lambda transaction: create_upsert_request(transaction, blocks, bulk),
+        retries,
+        f'a batch of {len(blocks):,} blocks',
+    )
 
-def add_transliteration_po_pair(predicate: str, tr: dict, po_pairs: List[tuple]):
-    value = tr.get('value', '').replace('"', '\\"')
-    value = f'"{value}"'
+    if sizer:
+        sizer.update(len(blocks), latency, aborts, generation)
 
-    po_pairs.append((predicate, value))
+    uids = resolve_uids(blocks, response, bulk)
+    _NODE_CACHE.set_many(uids)
 
+    return uids
 
-def load_alphabets(client, alphabets):
-    print('')
-    print(f'Importing {len(alphabets):,} alphabets...')
 
-    for alphabet in alphabets:
-        script_uid = get_node_uid(client, 'Script', alphabet.get('script_code'))
-        
-        po_pairs = [
-            ('characters', f'"{alphabet.get("letters", "")}"'),
-            ('script', f'<{script_uid}>' if script_uid else '""'),
+class LoadPool:
+    # Commits batches on a pool of worker threads. Batches that write a shared
+    # node (e.g. a Language by code or a Transliteration by hash) are tracked
+    # until they're committed, and any later batch touching the same key waits
+    # for them, so writes to the same key stay serialized and _NODE_CACHE
+    # never misses a UID.
+
+    def __init__(self, client: pydgraph.DgraphClient, workers: int):
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = BoundedSemaphore(workers * 2)
+        self.in_flight = {}
+        self.futures = []
+        self.lock = Lock()
+
+    def wait_for(self, node_type: str, key_value: str):
+        future = self.in_flight.get((node_type, key_value))
+
+        if future:
+            future.result()
+
+    def submit(self, blocks: List[dict], on_commit=None, **options):
+        self.check()
+        self.pending.acquire()
+
+        future = Future()
+        keys = [
+            (block['node_type'], block['key_value'])
+            for block in blocks
+            if block['key_name'] in shared_key_names
         ]
 
-        # Get UIDs for each transliteration.
-        name_trs = []
-        for name in alphabet.get('names'):
-            if name and name.get('lang_code'):
-                name_trs.append(name)
-
-        name_tr_uids = get_transliteration_uids(
-            client,
-            'Alphabet',
-            alphabet.get('code'),
-            name_trs,
-        )
+        with self.lock:
+            for key in keys:
+                self.in_flight[key] = future
+
+        self.futures.append(future)
+        self.executor.submit(self.run, blocks, keys, future, on_commit, options)
+
+    def run(self, blocks: List[dict], keys: list, future: Future, on_commit=None, options=None):
+        try:
+            uids = commit_blocks(self.client, blocks, **(options or {}))
+
+            if on_commit:
+                on_commit(uids)
+        except BaseException as error:
+            self.release(keys, future)
+            future.set_exception(error)
+        else:
+            self.release(keys, future)
+            future.set_result(uids)
+        finally:
+            self.pending.release()
+
+    def release(self, keys: list, future: Future):
+        with self.lock:
+            for key in keys:
+                if self.in_flight.get(key) is future:
+                    del self.in_flight[key]
+
+    def check(self):
+        # Surfaces the first failed batch as soon as the producer notices it.
+        done = [future for future in self.futures if future.done()]
+        self.futures = [future for future in self.futures if not future.done()]
+
+        for future in done:
+            future.result()
+
+    def join(self):
+        for future in self.futures:
+            future.result()
+
+        self.futures = []
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class UpsertBatch:
+    # Packs many upsert blocks into a single request. Every node gets its own
+    # query variable (u0, u1, ...) and mutation, and nodes in the same batch
+    # reference each other through those variables, so a record and all the
+    # nodes it points to are written in one round trip. In bulk mode, nodes
+    # missing from the UID map are new and reference each other as blank
+    # nodes instead, so nothing is looked up.
+
+    def __init__(
+        self,
+        client: pydgraph.DgraphClient,
+        size: int = UPSERT_BATCH_SIZE,
+        pool: LoadPool = None,
+        stage: str = None,
+        journal: Journal = None,
+        position: int = 0,
+        record_hashes: RecordHashes = None,
+        bulk: bool = False,
+        sizer: BatchSizer = None,
+    ):
+        self.client = client
+        self.bulk = bulk
+        self.sizer = sizer
+        self.size = max(1, size)
+        self.pool = pool
+        self.stage = stage
+        self.journal = journal
+        self.position = position
+        self.batch_start = position
+        self.last_id = None
+        self.record_hashes = record_hashes
+        self.pending_hashes = []
+        self.blocks = []
+        self.variables = {}
+        self.total_blocks = 0
+        self.total_requests = 0
+        self.total_known = 0
+        self.total_unchanged = 0
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def node(
+        self,
+        node_type: str,
+        key_name: str,
+        key_value: str,
+        po_pairs: List[tuple],
+        cond: str = None,
+    ) -> str:
+        key = (node_type, key_value)
+
+        if key in self.variables:
+            block = self.blocks[self.variables[key]]
+
+            # A node that gets real predicates is no longer just a reference.
+            if po_pairs:
+                block['cond'] = cond
+        else:
+            if self.pool and key_name in shared_key_names:
+                self.pool.wait_for(node_type, key_value)
+
+            self.variables[key] = len(self.blocks)
+            block = {
+                'node_type': node_type,
+                'key_name': key_name,
+                'key_value': key_value,
+                'po_pairs': [(key_name, quote(key_value))],
+                'cond': cond,
+                'uid': get_cached_uid(node_type, key_value),
+            }
+            self.blocks.append(block)
 
-        for uid in name_tr_uids:
-            po_pairs.append(('names', uid))
+        block['po_pairs'] += po_pairs
 
-        upsert(client, 'Alphabet', 'code', alphabet.get('code'), po_pairs)
+        if block['uid']:
+            return f'<{block["uid"]}>'
 
-    # Verify import
-    check_response = client.txn(read_only=True).query(
-        """{
-            alphabets(func: type(Alphabet)) {
-                Alphabet.code
-                Alphabet.names {
-                    expand(_all_)
-                }
-            }
-        }"""
+        if self.bulk:
+            return f'_:n{self.variables[key]}'
+
+        return f'uid(u{self.variables[key]})'
+
+    def shared(self, node_type: str, key_name: str, key_value: str, po_pairs: List[tuple]) -> str:
+        # Nodes whose key is derived from their content, like transliterations,
+        # are written at most once per batch and only referenced after that.
+        # Their key includes the key of the record they belong to, so they
+        # only come up again within the same record, and once per batch is
+        # as good as once per run. Once evicted from the UID map, they're
+        # looked up again like any other node.
+        key = (node_type, key_value)
+
+        if key in self.variables:
+            return self.node(node_type, key_name, key_value, [])
+
+        if self.pool:
+            self.pool.wait_for(node_type, key_value)
+
+        # A known UID only saves the lookup. The value predicates are still
+        # sent, since the key doesn't cover the language and script, which
+        # may have changed since the UID was cached.
+        if get_cached_uid(node_type, key_value):
+            self.total_known += 1
+
+        return self.node(node_type, key_name, key_value, po_pairs)
+
+    def ref(self, node_type: str, key_name: str, key_value: str) -> Union[str, None]:
+        if not key_value or len(key_value) < 1:
+            return None
+
+        if self.pool and (node_type, key_value) not in self.variables:
+            self.pool.wait_for(node_type, key_value)
+
+        uid = get_cached_uid(node_type, key_value)
+
+        if uid:
+            return f'<{uid}>'
+
+        return self.node(node_type, key_name, key_value, [], f'@if(eq(len(u{len(self.blocks)}), 0))')
+
+    def is_full(self) -> bool:
+        return len(self.blocks) >= (self.sizer.size if self.sizer else self.size)
+
+    def is_unchanged(self, key: str, record) -> bool:
+        # Records whose content hash matches the last committed one are
+        # skipped; the others have their new hash stored once they commit.
+        if not self.record_hashes:
+            return False
+
+        record_hash = get_record_hash(record)
+
+        if self.record_hashes.get(self.stage, key) == record_hash:
+            self.total_unchanged += 1
+            return True
+
+        self.pending_hashes.append((key, record_hash))
+
+        return False
+
+    def end_record(self, source_id=None):
+        # Batches only ever hold whole records, which is what lets the journal
+        # checkpoint them.
+        self.position += 1
+        self.last_id = source_id
+
+        if self.is_full():
+            self.flush()
+
+    def flush(self):
+        callbacks = []
+
+        if self.journal and self.position > self.batch_start:
+            callbacks.append(partial(
+                self.journal.record,
+                self.stage,
+                self.batch_start,
+                self.position,
+                self.last_id,
+            ))
+
+        if self.pending_hashes:
+            hashes = self.pending_hashes
+            callbacks.append(lambda uids: self.record_hashes.set_many(self.stage, hashes))
+
+        def on_commit(uids):
+            for callback in callbacks:
+                callback(uids)
+
+        self.batch_start = self.position
+        self.pending_hashes = []
+
+        if not self.blocks:
+            on_commit({})
+            return
+
+        blocks = self.blocks
+        self.blocks = []
+        self.variables = {}
+        self.total_blocks += len(blocks)
+        self.total_requests += 1
+
+        # The generation the batch was built in, for the sizer to tell
+        # batches built before its last decrease apart.
+        options = {
+            'bulk': self.bulk,
+            'sizer': self.sizer,
+            'generation': self.sizer.generation if self.sizer else None,
+        }
+
+        if self.pool:
+            self.pool.submit(blocks, on_commit, **options)
+        else:
+            on_commit(commit_blocks(self.client, blocks, **options))
+
+    def join(self):
+        self.flush()
+
+        if self.pool:
+            self.pool.join()
+
+        if self.journal:
+            self.journal.finish(self.stage, self.position)
+
+
+def get_hash(*args):
+    return sha256(bytes('.'.join(args), 'utf-8')).hexdigest()
+
+
+def get_hashes(node_type: str, code: str, values: list) -> list:
+    # Same as calling get_hash(node_type, code, value) for each value, but the
+    # shared prefix is only hashed once.
+    prefix = sha256(bytes(f'{node_type}.{code}.', 'utf-8'))
+    hashes = []
+
+    for value in values:
+        value_hash = prefix.copy()
+        value_hash.update(bytes(value, 'utf-8'))
+        hashes.append(value_hash.hexdigest())
+
+    return hashes
+
+
+def add_transliterations(batch: UpsertBatch, node_type: str, code: str, transliterations) -> list:
+    objects = []
+    hashes = get_hashes(node_type, code, [tr.value for tr in transliterations])
+
+    for tr, tr_hash in zip(transliterations, hashes):
+        po_pairs = [(key, quote(value)) for key, value in zip(tr._fields, tr) if value is not None]
+        objects.append(batch.shared('Transliteration', 'hash', tr_hash, po_pairs))
+
+    return objects
+
+
+def get_expression_key(expression, languages: set):
+    # Expressions that load_expressions skips never reach the graph, and the
+    # languages the others reference do.
+    if skip_expression_titles & set([t.value for t in expression.titles]):
+        return None
+
+    languages.update(code for code in expression.languages if code)
+
+    return expression.uuid
+
+
+def start_stage(
+    client,
+    stage,
+    records,
+    get_id,
+    batch_size=UPSERT_BATCH_SIZE,
+    pool=None,
+    journal=None,
+    record_hashes=None,
+    bulk=False,
+    sizer=None,
+):
+    position = 0
+
+    if journal and stage in journal.finished:
+        print(f'Skipping {stage}, already loaded according to {journal.path}.')
+        records = []
+    elif journal:
+        records, position = journal.resume(stage, records, get_id)
+
+    return UpsertBatch(client, batch_size, pool, stage, journal, position, record_hashes, bulk, sizer), records
+
+
+def load_scripts(client, scripts, **options):
+    print('')
+    print('Importing scripts...')
+    batch, scripts = start_stage(client, 'scripts', scripts, lambda code: code, **options)
+    total = 0
+
+    for script_code in scripts:
+        total += 1
+        batch.ref('Script', 'code', script_code)
+        batch.end_record(script_code)
+
+    batch.join()
+    print(f'Imported {total:,} scripts in {batch.total_requests:,} requests.')
+
+
+def load_alphabets(client, alphabets, **options):
+    print('')
+    print('Importing alphabets...')
+    batch, alphabets = start_stage(
+        client,
+        'alphabets',
+        alphabets,
+        lambda alphabet: alphabet.code,
+        **options,
     )
+    total = 0
+
+    for alphabet in alphabets:
+        total += 1
+
+        if batch.is_unchanged(alphabet.code, alphabet):
+            batch.end_record(alphabet.code)
+            continue
+
+        po_pairs = [('characters', quote(alphabet.letters))]
+        script = batch.ref('Script', 'code', alphabet.script_code)
+
+        if script:
+            po_pairs.append(('script', script))
 
-    check_json = json.loads(check_response.json.decode('utf-8'))
-    print(f'Total alphabets in graph: {len(check_json["alphabets"]):,}')
+        names = [name for name in alphabet.names if name.lang_code]
 
-    for alphabet in check_json['alphabets']:
-        names = transliteration_to_str(alphabet.get('Alphabet.names', []))
-        print(f' - {alphabet.get("Alphabet.code")}: {names}')
+        for obj in add_transliterations(batch, 'Alphabet', alphabet.code, names):
+            po_pairs.append(('names', obj))
 
+        batch.node('Alphabet', 'code', alphabet.code, po_pairs)
+        batch.end_record(alphabet.code)
 
-def load_expressions(client, expressions):
+    batch.join()
+    print(f'Imported {total:,} alphabets in {batch.total_requests:,} requests '
+          f'({batch.total_unchanged:,} unchanged, {batch.total_known:,} transliteration UIDs already known).')
+
+
+def load_expressions(client, expressions, **options):
     print('')
-    print(f'Importing {len(expressions):,} expressions...')
+    print('Importing expressions...')
+    batch, expressions = start_stage(
+        client,
+        'expressions',
+        expressions,
+        lambda expression: expression.source_id,
+        **options,
+    )
+    total = 0
 
     for expression in expressions:
-        if bool(skip_expression_titles & set([t.get('value') for t in expression.get('titles')])):
+        if bool(skip_expression_titles & set([t.value for t in expression.titles])):
+            batch.end_record(expression.source_id)
+            continue
+
+        total += 1
+        uuid = expression.uuid
+
+        if batch.is_unchanged(uuid, expression):
+            batch.end_record(expression.source_id)
             continue
 
-        uuid = expression.get('uuid')
-        titles = get_transliteration_uids(client, 'Expression', uuid, expression.get('titles'))
         po_pairs = [
-            ('type', f'"{expression.get("type")}"'),
+            ('type', quote(expression.type)),
         ]
 
-        for uid in titles:
-            po_pairs.append(('titles', uid))
-        
-        for lang_code in expression.get('languages', []):
-            uid = get_node_uid(client, 'Language', lang_code)
-            po_pairs.append(('languages', f'<{uid}>'))
+        for obj in add_transliterations(batch, 'Expression', uuid, expression.titles):
+            po_pairs.append(('titles', obj))
+
+        for lang_code in expression.languages:
+            language = batch.ref('Language', 'code', lang_code)
+
+            if language:
+                po_pairs.append(('languages', language))
+
+        if expression.part_of_speech:
+            po_pairs.append(('partOfSpeech', quote(expression.part_of_speech)))
 
-        if expression.get("part_of_speech"):
-            po_pairs.append(('partOfSpeech', f'"{expression.get("part_of_speech")}"'))
-        
         # Get transliterations for literal/practical translations and meanings.
         for field in ('literal_translation', 'practical_translation', 'meaning'):
-            uids = get_transliteration_uids(client, f'Expression.{field}', uuid, expression.get(field))
-
-            for uid in uids:
-                po_pairs.append((f'{field.replace("_t", "T")}s', uid))
+            for obj in add_transliterations(batch, f'Expression.{field}', uuid, getattr(expression, field)):
+                po_pairs.append((f'{field.replace("_t", "T")}s', obj))
 
         # TODO: tags
 
-        upsert(client, 'Expression', 'uuid', uuid, po_pairs)
-    
-    # Verify import
-    check_response = client.txn(read_only=True).query(
-        """{
-            expressions(func: type(Expression)) {
-                Expression.uuid
-                Expression.practicalTranslations {
-                    expand(_all_)
-                }
-                Expression.languages {
-                    expand(_all_)
-                }
-                Expression.titles {
-                    expand(_all_)
-                }
-            }
-        }"""
-    )
-
-    check_json = json.loads(check_response.json.decode('utf-8'))
-    print(f'Total Expressions in graph: {len(check_json["expressions"]):,}')
+        batch.node('Expression', 'uuid', uuid, po_pairs)
+        batch.end_record(expression.source_id)
 
-    for ex in check_json['expressions']:
-        transliterations = transliteration_to_str(ex.get('Expression.titles', []))
-        translations = transliteration_to_str(ex.get('Expression.practicalTranslations', []))
-        print(f' - {ex.get("Expression.uuid")[:6]}: {transliterations} == {translations}')
+    batch.join()
+    print(f'Imported {total:,} expressions in {batch.total_requests:,} requests '
+          f'({batch.total_unchanged:,} unchanged, {batch.total_known:,} transliteration UIDs already known).')
 
 
-def load_languages(client, languages):
+def load_languages(client, languages, **options):
     print('')
-    print(f'Importing {len(languages):,} languages...')
-
-    for language in languages:
-        po_pairs = []
-        transliterations = get_transliteration_uids(
-            client,
-            'Language',
-            language.get('code'),
-            language.get('names'),
-        )
-
-        for uid in transliterations:
-            po_pairs.append(('names', uid))
-
-        parent_uid = get_node_uid(client, 'Language', language.get('parent_code'))
-        
-        if parent_uid:
-            po_pairs.append(('parent', f'<{parent_uid}>'))
-        
-        upsert(client, 'Language', 'code', language.get('code'), po_pairs)
-    
-    # Verify import
-    check_response = client.txn(read_only=True).query(
-        """{
-            languages(func: type(Language)) {
-                Language.code
-                Language.names {
-                    expand(_all_)
-                }
-            }
-        }"""
+    print('Importing languages...')
+    batch, languages = start_stage(
+        client,
+        'languages',
+        languages,
+        lambda language: language.code,
+        **options,
     )
+    total = 0
 
-    check_json = json.loads(check_response.json.decode('utf-8'))
-    print(f'Total languages in graph: {len(check_json["languages"]):,}')
+    for language in languages:
+        total += 1
 
-    for lang in check_json['languages']:
-        transliterations = transliteration_to_str(lang.get("Language.names", []))
-        print(f' - {lang.get("Language.code")}: {transliterations}')
+        if batch.is_unchanged(language.code, language):
+            batch.end_record(language.code)
+            continue
 
+        po_pairs = []
 
-def load_all(data):
+        for obj in add_transliterations(batch, 'Language', language.code, language.names):
+            po_pairs.append(('names', obj))
+
+        parent = batch.ref('Language', 'code', language.parent_code)
+
+        if parent:
+            po_pairs.append(('parent', parent))
+
+        batch.node('Language', 'code', language.code, po_pairs)
+        batch.end_record(language.code)
+
+    batch.join()
+    print(f'Imported {total:,} languages in {batch.total_requests:,} requests '
+          f'({batch.total_unchanged:,} unchanged, {batch.total_known:,} transliteration UIDs already known).')
+
+
+def load_all(
+    data,
+    batch_size=UPSERT_BATCH_SIZE,
+    workers=1,
+    stubs_per_address=1,
+    addresses=(DGRAPH_ADDRESS,),
+    preload=False,
+    uid_map_path=None,
+    uid_map_capacity=UID_MAP_CAPACITY,
+    journal_path=JOURNAL_PATH,
+    resume=False,
+    delta_path=None,
+    indices_path=None,
+    adaptive=False,
+    target_latency=TARGET_LATENCY,
+    verify=True,
+):
     result = True
-    stub, client = open_graph_connection()
+    stubs, client = open_graph_connection(addresses, stubs_per_address)
+    pool = LoadPool(client, workers) if workers > 1 else None
+    journal = None
+    record_hashes = None
+    indices = None
+    sizer = BatchSizer(batch_size, target_latency) if adaptive else None
 
     try:
-        load_alphabets(client, data.get('alphabets', []))
-        load_expressions(client, data.get('expressions', []))
-        load_languages(client, data.get('languages', []))
+        # A bulk load never looks nodes up, so the UID map must not forget
+        # any of them.
+        if indices_path and not uid_map_path:
+            uid_map_capacity = sys.maxsize
+
+        uid_map = open_uid_map(client, uid_map_path, uid_map_capacity)
+
+        if uid_map_path:
+            print(f'Reusing {len(uid_map):,} UIDs from {uid_map_path}.')
+
+        journal = Journal(journal_path, resume)
+        finished = set(journal.finished)
+
+        # UIDs assigned by the interrupted run are needed to reference the
+        # nodes it already wrote.
+        if journal.uids:
+            print(f'Reusing {len(journal.uids):,} UIDs from {journal_path}.')
+            uid_map.set_many(journal.uids)
+
+        if delta_path:
+            print(f'Only writing records that changed since the last sync recorded in {delta_path}.')
+            record_hashes = RecordHashes(delta_path)
+
+            if not validate_record_hashes(client, record_hashes):
+                print(f'Records hashed in {delta_path} are missing from this Dgraph cluster, clearing it.')
+                record_hashes.clear()
+
+        if indices_path:
+            with open(indices_path, encoding='utf-8') as indices_file:
+                indices = indices_file.read()
+
+            # Nodes already in the graph could only be found through the
+            # indexes, so they must all be known up front. This is checked
+            # before preloading, which only fetches some node types.
+            if not len(uid_map) and not graph_is_empty(client):
+                raise ValueError('Bulk loads need an empty graph, or the --uid-map of the sync that filled it.')
+
+            print('')
+            print(f'Dropping the indexes in {indices_path} until the load is done...')
+            drop_indices(client, indices)
+
+        if preload:
+            print('')
+            print('Preloading existing node UIDs...')
+            preload_node_cache(client)
+
+        print('')
+        print('Planning load order...')
+        plan = build_load_plan(data)
+
+        # Expressions are only seen once as they stream through, so their keys
+        # are added up on the way to the graph.
+        expression_digest = KeyDigest()
+        expression_languages = set()
+
+        if verify:
+            plan['expressions'] = watch_keys(
+                plan['expressions'],
+                expression_digest,
+                partial(get_expression_key, languages=expression_languages),
+            )
+
+        options = {
+            'batch_size': batch_size,
+            'pool': pool,
+            'journal': journal,
+            'record_hashes': record_hashes,
+            'bulk': bool(indices),
+            'sizer': sizer,
+        }
+
+        load_scripts(client, plan['scripts'], **options)
+        load_languages(client, plan['languages'], **options)
+        load_alphabets(client, plan['alphabets'], **options)
+        load_expressions(client, plan['expressions'], **options)
+
+        if sizer:
+            print('')
+            print(f'Grew the batch size {sizer.total_increases:,} times and shrank it '
+                  f'{sizer.total_decreases:,} times.')
+            sizer.log()
+
+        if indices:
+            print('')
+            print(f'Applying {indices_path}...')
+            apply_indices(client, indices)
+
+        if verify:
+            print('')
+            print('Verifying the graph...')
+            digests = {
+                'Script': KeyDigest(plan['scripts']),
+                'Language': KeyDigest({language.code for language in plan['languages']} | expression_languages),
+                'Alphabet': KeyDigest(alphabet.code for alphabet in plan['alphabets']),
+                'Expression': expression_digest,
+            }
+
+            # Stages an earlier run finished weren't read this time.
+            for stage, node_type in stage_types.items():
+                if stage in finished:
+                    del digests[node_type]
+
+            verify_graph(client, digests)
     except Exception as error:
         result = False
         print(f'TODO: handle error type "{type(error)}".')
         print(error)
+
+        if indices:
+            print('Indexes are still off, run the sync again with --resume to finish the bulk load.')
     finally:
-        close_graph_connection(stub, client)
+        if pool:
+            pool.close()
+
+        if journal:
+            journal.close()
+
+        if record_hashes:
+            record_hashes.close()
+
+        _NODE_CACHE.close()
+        close_graph_connection(stubs, client)
 
     return result
@@ -0,0 +1,107 @@
+import json
+import os
+from collections import deque
+from itertools import islice
+from threading import Lock
+
+JOURNAL_PATH = 'sync-journal.jsonl'
+
+
+class Journal:
+    # Appends one JSON line per committed batch: the stage, the range of
+    # stage records it covered, the source ID of its last record and the UIDs
+    # Dgraph assigned. Batches can commit out of order when several workers
+    # are used, so the checkpoint of a stage is the end of the contiguous
+    # range of committed records starting from its first record.
+
+    def __init__(self, path: str = JOURNAL_PATH, resume: bool = False):
+        self.path = path
+        self.lock = Lock()
+        self.ranges = {}
+        self.last_ids = {}
+        self.finished = set()
+        self.uids = {}
+
+        if resume and os.path.exists(path):
+            self.read()
+
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def read(self):
+        with open(self.path, encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be cut short if the previous run died
+                    # while writing it.
+                    continue
+
+                stage = entry['stage']
+
+                if entry.get('finished'):
+                    self.finished.add(stage)
+                    continue
+
+                self.ranges.setdefault(stage, []).append((entry['start'], entry['end']))
+                self.last_ids[(stage, entry['end'])] = entry.get('last_id')
+
+                for node_type, key_value, uid in entry.get('uids', []):
+                    self.uids[(node_type, key_value)] = uid
+
+    def checkpoint(self, stage: str) -> int:
+        position = 0
+
+        for start, end in sorted(self.ranges.get(stage, [])):
+            if start > position:
+                break
+
+            position = max(position, end)
+
+        return position
+
+    def resume(self, stage: str, records, get_id):
+        # Skips the records of a stage up to its checkpoint, checking that the
+        # last skipped record is the one the journal ended on. Returns the
+        # remaining records and the position of the first one.
+        position = self.checkpoint(stage)
+
+        if not position:
+            return records, 0
+
+        records = iter(records)
+        deque(islice(records, position - 1), maxlen=0)
+        last = next(records, None)
+        expected_id = self.last_ids.get((stage, position))
+
+        if last is None or (expected_id is not None and get_id(last) != expected_id):
+            raise ValueError(
+                f'Checkpoint for {stage} does not match the source data, '
+                f'run the sync again without --resume.'
+            )
+
+        print(f'Resuming {stage} after {position:,} records (last source ID: {expected_id}).')
+
+        return records, position
+
+    def record(self, stage: str, start: int, end: int, last_id, uids: dict):
+        entry = {
+            'stage': stage,
+            'start': start,
+            'end': end,
+            'last_id': last_id,
+            'uids': [[node_type, key_value, uid] for (node_type, key_value), uid in uids.items()],
+        }
+
+        with self.lock:
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+
+    def finish(self, stage: str, total: int):
+        with self.lock:
+            self.finished.add(stage)
+            self.file.write(json.dumps({'stage': stage, 'finished': True, 'total': total}) + '\n')
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
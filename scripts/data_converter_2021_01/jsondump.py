@@ -0,0 +1,247 @@
+import codecs
+import json
+import os
+import re
+import shutil
+import tarfile
+import threading
+from tempfile import TemporaryDirectory
+
+from .compress import open_compressed
+from .db import source_tables
+from .dump import read_dump_records
+
+JSON_READ_SIZE = 64 * 1024
+
+# Tables too large to hold in memory. The others are joined against them and
+# are held in memory once read from an archive.
+_STREAMED_TABLES = ('definitions', 'translations')
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+# Integer columns the readers look values up by.
+_INTEGER_COLUMN = re.compile(r'^(?:id|type|\w+_id)$')
+
+
+def iterate_array(stream, read_size: int = JSON_READ_SIZE):
+    # Decodes a JSON array one element at a time, reading `read_size`
+    # characters at a time, so a table is never parsed as a whole.
+    buffer = ''
+    offset = 0
+    started = False
+
+    while True:
+        offset = (_SEPARATORS if started else _WHITESPACE).match(buffer, offset).end()
+
+        if offset < len(buffer):
+            if not started:
+                if buffer[offset] != '[':
+                    raise ValueError('Expected a JSON array of rows.')
+
+                offset += 1
+                started = True
+                continue
+
+            if buffer[offset] == ']':
+                return
+
+            try:
+                value, end = _DECODER.raw_decode(buffer, offset)
+            except ValueError:
+                # The row is cut off by the end of the buffer.
+                pass
+            else:
+                yield value
+                offset = end
+                continue
+
+        chunk = stream.read(read_size)
+
+        if not chunk:
+            raise ValueError('Unexpected end of JSON array.')
+
+        buffer = buffer[offset:] + chunk
+        offset = 0
+
+
+def to_column_value(column: str, value):
+    # PHP's MySQL driver returned every column as a string, numbers included;
+    # the readers expect IDs and types as numbers, like the SQL dump has them.
+    if isinstance(value, str) and value.isdigit() and _INTEGER_COLUMN.match(column):
+        return int(value)
+
+    return value
+
+
+def find_table_files(directory: str) -> dict:
+    return {
+        name[:-len('.json')]: os.path.join(parent, name)
+        for parent, _, names in os.walk(directory)
+        for name in names
+        if name.endswith('.json')
+    }
+
+
+class JsonDump:
+    # Reads the 2017 JSON dump, which holds a `<table>.json` file per table
+    # with a JSON array of rows keyed by column name. The dump can be read
+    # from its tar.gz archive without being extracted, or from a directory it
+    # was extracted to. Tables are read with the same calls as a DumpFile's,
+    # so the same readers turn both into records.
+    #
+    # An archive is only decompressed once, however its members are ordered
+    # and in whatever order the readers ask for tables. Small tables are held
+    # in memory as the archive goes by. A large table is streamed straight
+    # from the archive when it's asked for after every small table was read;
+    # otherwise it's spooled, uncompressed, to a temporary file.
+
+    def __init__(self, path):
+        self.path = path
+        self.files = None
+        self.tables = {}
+        self.condition = threading.Condition()
+        self.streaming = False
+        self.stream = None
+        self.archive = None
+        self.members = None
+        self.streamed = set()
+        self.spool_dir = None
+
+        if os.path.isdir(path):
+            self.files = find_table_files(path)
+        elif not tarfile.is_tarfile(path):
+            raise ValueError(f'{path} is neither a directory nor a tar archive.')
+
+    def close(self):
+        self.close_archive()
+        self.tables.clear()
+
+        if self.spool_dir:
+            self.spool_dir.cleanup()
+            self.spool_dir = None
+
+    def close_archive(self):
+        if self.archive:
+            self.archive.close()
+            self.stream.close()
+
+        self.stream = None
+        self.archive = None
+        self.members = None
+        self.streamed.clear()
+
+    def spool(self, table, member_file):
+        if not self.spool_dir:
+            self.spool_dir = TemporaryDirectory(prefix='json-dump-')
+
+        path = os.path.join(self.spool_dir.name, f'{table}.json')
+
+        with open(path, 'wb') as spool_file:
+            shutil.copyfileobj(member_file, spool_file)
+
+        return path
+
+    def find_table(self, table):
+        # Reads the archive up to the table and returns its rows, the path it
+        # was spooled to, or its member to stream from. Tables passed on the
+        # way are kept for later.
+        if table in self.tables:
+            return self.tables[table]
+
+        if not self.archive:
+            self.stream = open_compressed(self.path)
+            self.archive = tarfile.open(fileobj=self.stream, mode='r|')
+            # Iterating the archive again would start over from its first
+            # member, which a streamed archive can't go back to.
+            self.members = iter(self.archive)
+
+        for member in self.members:
+            if not member.isfile() or not member.name.endswith('.json'):
+                continue
+
+            name = os.path.basename(member.name)[:-len('.json')]
+
+            if name not in source_tables or name in self.tables:
+                continue
+
+            member_file = self.archive.extractfile(member)
+
+            if name not in _STREAMED_TABLES:
+                # Members of a streamed archive can't seek, which
+                # TextIOWrapper requires.
+                self.tables[name] = list(iterate_array(codecs.getreader('utf-8')(member_file)))
+            elif name == table and all(
+                other in self.tables
+                for other in source_tables
+                if other not in _STREAMED_TABLES
+            ):
+                self.streamed.add(name)
+                return member_file
+            else:
+                self.tables[name] = self.spool(name, member_file)
+
+            if name == table:
+                return self.tables[table]
+
+        # A table streamed earlier is only read again from a new pass.
+        streamed = table in self.streamed
+        self.close_archive()
+
+        if streamed:
+            return self.find_table(table)
+
+        raise ValueError(f'No {table}.json in {self.path}.')
+
+    def read_archive_rows(self, table):
+        # Readers may ask for tables from different threads, so only one of
+        # them reads the archive at a time, and a table streamed from it
+        # keeps it until the table has been read.
+        with self.condition:
+            if table not in self.tables:
+                self.condition.wait_for(lambda: not self.streaming)
+
+            rows = self.find_table(table)
+
+            if not isinstance(rows, (list, str)):
+                self.streaming = True
+
+        if isinstance(rows, list):
+            yield from rows
+        elif isinstance(rows, str):
+            with open(rows, encoding='utf-8') as table_file:
+                yield from iterate_array(table_file)
+        else:
+            try:
+                yield from iterate_array(codecs.getreader('utf-8')(rows))
+            finally:
+                with self.condition:
+                    self.streaming = False
+                    self.condition.notify_all()
+
+    def read_rows(self, table):
+        if self.files is None:
+            yield from self.read_archive_rows(table)
+
+            return
+
+        if table not in self.files:
+            raise ValueError(f'No {table}.json in {self.path}.')
+
+        with open(self.files[table], encoding='utf-8') as table_file:
+            yield from iterate_array(table_file)
+
+    def read_table(self, table, columns):
+        for row in self.read_rows(table):
+            yield tuple(to_column_value(column, row.get(column)) for column in columns)
+
+
+def read_json_dump(path):
+    try:
+        dump = JsonDump(path)
+    except (OSError, ValueError) as error:
+        print(f'Could not open JSON dump "{path}":', error)
+        return None
+
+    return read_dump_records(dump)
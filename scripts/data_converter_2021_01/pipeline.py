@@ -0,0 +1,107 @@
+import time
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+
+PIPELINE_QUEUE_SIZE = 1000
+
+_DONE = object()
+
+
+class Prefetcher:
+    # Runs a record iterator on its own thread and hands records over through
+    # a bounded queue. When the queue is full the producer waits for the
+    # loader, and when it's empty the loader waits for the producer; both
+    # waits are timed so the slower stage shows up in the report.
+
+    def __init__(self, name: str, records, maxsize: int = PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.records = records
+        self.queue = Queue(maxsize=max(1, maxsize))
+        self.stopped = Event()
+        self.total = 0
+        self.producer_wait = 0.0
+        self.consumer_wait = 0.0
+        self.thread = Thread(target=self.produce, name=f'prefetch-{name}', daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        started = time.perf_counter()
+
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                break
+            except Full:
+                continue
+
+        self.producer_wait += time.perf_counter() - started
+
+    def produce(self):
+        try:
+            for record in self.records:
+                if self.stopped.is_set():
+                    return
+
+                self.put(record)
+        except BaseException as error:
+            self.put((_DONE, error))
+        else:
+            self.put((_DONE, None))
+
+    def __iter__(self):
+        try:
+            while True:
+                started = time.perf_counter()
+                item = self.queue.get()
+                self.consumer_wait += time.perf_counter() - started
+
+                if isinstance(item, tuple) and len(item) == 2 and item[0] is _DONE:
+                    if item[1] is not None:
+                        raise item[1]
+
+                    return
+
+                self.total += 1
+                yield item
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stopped.set()
+
+        # Unblocks a producer waiting on a full queue.
+        try:
+            while True:
+                self.queue.get_nowait()
+        except Empty:
+            pass
+
+
+def pipeline(data, maxsize: int = PIPELINE_QUEUE_SIZE):
+    # Starts extracting every table right away; each one fills its own
+    # bounded queue while the loader works through the tables in order.
+    prefetchers = []
+    result = {}
+
+    for name, records in data.items():
+        if name == 'stories':
+            result[name] = records
+            continue
+
+        prefetcher = Prefetcher(name, records, maxsize)
+        prefetchers.append(prefetcher)
+        result[name] = prefetcher
+
+    return result, prefetchers
+
+
+def report(prefetchers):
+    print('')
+    print('Pipeline waits:')
+
+    for prefetcher in prefetchers:
+        print(
+            f' - {prefetcher.name}: {prefetcher.total:,} records, '
+            f'extraction waited {prefetcher.producer_wait:.1f}s on loading, '
+            f'loading waited {prefetcher.consumer_wait:.1f}s on extraction'
+        )
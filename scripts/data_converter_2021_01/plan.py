@@ -0,0 +1,82 @@
+from collections import deque
+from typing import Dict, List
+
+from .records import Language
+
+
+def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    # Kahn's algorithm, keeping the input order among nodes that are ready at
+    # the same time. Nodes caught in a cycle are appended in input order.
+    remaining = {
+        key: {dep for dep in deps if dep in dependencies and dep != key}
+        for key, deps in dependencies.items()
+    }
+    dependents = {key: [] for key in dependencies}
+
+    for key, deps in remaining.items():
+        for dep in deps:
+            dependents[dep].append(key)
+
+    ready = deque(key for key, deps in remaining.items() if not deps)
+    order = []
+
+    while ready:
+        key = ready.popleft()
+        order.append(key)
+
+        for dependent in dependents[key]:
+            remaining[dependent].discard(key)
+
+            if not remaining[dependent]:
+                ready.append(dependent)
+
+    if len(order) < len(dependencies):
+        cycle = [key for key in dependencies if key not in set(order)]
+        print(f'Warning: {len(cycle):,} nodes have circular references: {", ".join(cycle[:10])}')
+        order += cycle
+
+    return order
+
+
+def build_load_plan(data):
+    # Scripts and languages are referenced by everything else, so they're
+    # written first and every later reference resolves from the UID map.
+    # Languages are small enough to hold in memory and are ordered so that
+    # parents come before their children; alphabets are held as well so
+    # their scripts are known up front. Nothing references expressions, so
+    # they stream through last. Transliterations are leaves and are written
+    # in the same request as the node that owns them.
+    alphabets = list(data.get('alphabets', []))
+    languages = {}
+
+    for language in data.get('languages', []):
+        languages[language.code] = language
+
+    # Parent languages missing from the languages table still need a node.
+    for language in list(languages.values()):
+        parent_code = language.parent_code
+
+        if parent_code and parent_code not in languages:
+            languages[parent_code] = Language(parent_code, None, ())
+
+    order = topological_order({
+        code: [language.parent_code] if language.parent_code else []
+        for code, language in languages.items()
+    })
+
+    scripts = []
+
+    for alphabet in alphabets:
+        script_code = alphabet.script_code
+
+        if script_code and script_code not in scripts:
+            scripts.append(script_code)
+
+    print(f'Planned {len(scripts):,} scripts, {len(order):,} languages and {len(alphabets):,} alphabets.')
+
+    return {
+        'scripts': scripts,
+        'languages': [languages[code] for code in order],
+        'alphabets': alphabets,
+        'expressions': data.get('expressions', []),
+    }
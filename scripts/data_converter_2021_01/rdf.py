@@ -0,0 +1,258 @@
+import gzip
+import re
+
+from .graph import get_hash, get_hashes, quote, skip_expression_titles
+
+_SAFE_LABEL = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+schema = """
+Alphabet.code: string @index(exact) @upsert .
+Alphabet.characters: string .
+Alphabet.names: [uid] .
+Alphabet.script: uid .
+Expression.uuid: string @index(exact) @upsert .
+Expression.type: string .
+Expression.titles: [uid] .
+Expression.languages: [uid] .
+Expression.partOfSpeech: string .
+Expression.literalTranslations: [uid] .
+Expression.practicalTranslations: [uid] .
+Expression.meanings: [uid] .
+Language.code: string @index(exact) @upsert .
+Language.names: [uid] .
+Language.parent: uid .
+Script.code: string @index(exact) @upsert .
+Transliteration.hash: string @index(exact) @upsert .
+Transliteration.value: string .
+Transliteration.lang_code: string .
+Transliteration.script_code: string .
+
+type Alphabet {
+    Alphabet.code
+    Alphabet.characters
+    Alphabet.names
+    Alphabet.script
+}
+
+type Expression {
+    Expression.uuid
+    Expression.type
+    Expression.titles
+    Expression.languages
+    Expression.partOfSpeech
+    Expression.literalTranslations
+    Expression.practicalTranslations
+    Expression.meanings
+}
+
+type Language {
+    Language.code
+    Language.names
+    Language.parent
+}
+
+type Script {
+    Script.code
+}
+
+type Transliteration {
+    Transliteration.hash
+    Transliteration.value
+    Transliteration.lang_code
+    Transliteration.script_code
+}
+"""
+
+
+def blank_node(node_type: str, key_value: str) -> str:
+    key_value = str(key_value)
+
+    if not _SAFE_LABEL.match(key_value):
+        key_value = get_hash(key_value)
+
+    return f'_:{node_type}.{key_value}'
+
+
+class RdfWriter:
+    # Writes N-Quads with blank-node subjects to a gzip file. Script and
+    # language code nodes, which many records share, are only written once
+    # per file. Transliteration keys include their record's key, so they're
+    # only deduplicated within a record and nothing grows with the file.
+
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.written = set()
+        self.total = 0
+
+    def close(self):
+        self.file.close()
+
+    def write(self, subject: str, predicate: str, obj: str):
+        self.file.write(f'{subject} <{predicate}> {obj} .\n')
+        self.total += 1
+
+    def write_node(self, node_type: str, key_name: str, key_value: str, po_pairs: list) -> str:
+        subject = blank_node(node_type, key_value)
+        self.write(subject, f'{node_type}.{key_name}', quote(key_value))
+        self.write(subject, 'dgraph.type', quote(node_type))
+
+        for predicate, obj in po_pairs:
+            self.write(subject, f'{node_type}.{predicate}', obj)
+
+        return subject
+
+    def write_shared_node(self, node_type: str, key_name: str, key_value: str, po_pairs: list):
+        subject = blank_node(node_type, key_value)
+
+        if subject not in self.written:
+            self.written.add(subject)
+            self.write_node(node_type, key_name, key_value, po_pairs)
+
+        return subject
+
+    def write_code_node(self, node_type: str, code: str):
+        if not code or len(code) < 1:
+            return None
+
+        return self.write_shared_node(node_type, 'code', code, [])
+
+    def write_transliterations(self, node_type: str, code: str, transliterations: list) -> list:
+        subjects = []
+        written = set()
+        hashes = get_hashes(node_type, code, [tr.value for tr in transliterations])
+
+        for tr, tr_hash in zip(transliterations, hashes):
+            po_pairs = [
+                (key, quote(value))
+                for key, value in zip(tr._fields, tr)
+                if value is not None
+            ]
+
+            subject = blank_node('Transliteration', tr_hash)
+
+            if subject not in written:
+                written.add(subject)
+                self.write_node('Transliteration', 'hash', tr_hash, po_pairs)
+
+            subjects.append(subject)
+
+        return subjects
+
+
+def write_alphabets(writer: RdfWriter, alphabets):
+    total = 0
+
+    for alphabet in alphabets:
+        total += 1
+        po_pairs = [('characters', quote(alphabet.letters))]
+        script = writer.write_code_node('Script', alphabet.script_code)
+
+        if script:
+            po_pairs.append(('script', script))
+
+        names = [name for name in alphabet.names if name.lang_code]
+
+        for subject in writer.write_transliterations('Alphabet', alphabet.code, names):
+            po_pairs.append(('names', subject))
+
+        writer.write_node('Alphabet', 'code', alphabet.code, po_pairs)
+
+    print(f'Wrote {total:,} alphabets.')
+
+
+def write_expressions(writer: RdfWriter, expressions):
+    total = 0
+
+    for expression in expressions:
+        if bool(skip_expression_titles & set([t.value for t in expression.titles])):
+            continue
+
+        total += 1
+        uuid = expression.uuid
+        po_pairs = [('type', quote(expression.type))]
+
+        for subject in writer.write_transliterations('Expression', uuid, expression.titles):
+            po_pairs.append(('titles', subject))
+
+        for lang_code in expression.languages:
+            language = writer.write_code_node('Language', lang_code)
+
+            if language:
+                po_pairs.append(('languages', language))
+
+        if expression.part_of_speech:
+            po_pairs.append(('partOfSpeech', quote(expression.part_of_speech)))
+
+        for field in ('literal_translation', 'practical_translation', 'meaning'):
+            for subject in writer.write_transliterations(
+                f'Expression.{field}',
+                uuid,
+                getattr(expression, field),
+            ):
+                po_pairs.append((f'{field.replace("_t", "T")}s', subject))
+
+        writer.write_node('Expression', 'uuid', uuid, po_pairs)
+
+    print(f'Wrote {total:,} expressions.')
+
+
+def write_languages(writer: RdfWriter, languages):
+    total = 0
+
+    for language in languages:
+        total += 1
+        po_pairs = []
+
+        for subject in writer.write_transliterations(
+            'Language',
+            language.code,
+            language.names,
+        ):
+            po_pairs.append(('names', subject))
+
+        parent = writer.write_code_node('Language', language.parent_code)
+
+        if parent:
+            po_pairs.append(('parent', parent))
+
+        # Languages referenced earlier by expressions already have their
+        # code and type, so only the remaining predicates are added here.
+        subject = blank_node('Language', language.code)
+
+        if subject in writer.written:
+            for predicate, obj in po_pairs:
+                writer.write(subject, f'Language.{predicate}', obj)
+        else:
+            writer.written.add(subject)
+            writer.write_node('Language', 'code', language.code, po_pairs)
+
+    print(f'Wrote {total:,} languages.')
+
+
+def write_schema(path):
+    with open(path, 'w', encoding='utf-8') as schema_file:
+        schema_file.write(schema.lstrip())
+
+
+def write_all(data, path, schema_path=None):
+    result = True
+    writer = None
+
+    try:
+        writer = RdfWriter(path)
+        write_alphabets(writer, data.get('alphabets', []))
+        write_expressions(writer, data.get('expressions', []))
+        write_languages(writer, data.get('languages', []))
+        print(f'Wrote {writer.total:,} N-Quads to {path}.')
+
+        if schema_path:
+            write_schema(schema_path)
+            print(f'Wrote Dgraph schema to {schema_path}.')
+    except Exception as error:
+        result = False
+        print(f'Could not write RDF file "{path}":', error)
+    finally:
+        if writer:
+            writer.close()
+
+    return result
@@ -0,0 +1,51 @@
+from sys import intern
+from typing import NamedTuple, Optional, Tuple
+
+# Records are named tuples rather than dicts: they have no per-instance
+# dict, nested lists are stored as tuples (the empty ones all being the same
+# object), and the few distinct language and script codes are interned so
+# every record shares the same strings.
+
+
+def intern_value(value: Optional[str]) -> Optional[str]:
+    return intern(value) if value else value
+
+
+def intern_code(code: Optional[str]) -> Optional[str]:
+    return intern(code.lower()) if code else None
+
+
+class Transliteration(NamedTuple):
+    value: str
+    lang_code: Optional[str] = None
+    script_code: Optional[str] = None
+
+
+class Alphabet(NamedTuple):
+    code: str
+    script_code: Optional[str]
+    names: Tuple[Transliteration, ...]
+    letters: str
+
+
+class Language(NamedTuple):
+    code: str
+    parent_code: Optional[str]
+    names: Tuple[Transliteration, ...]
+
+
+class Expression(NamedTuple):
+    type: str
+    titles: Tuple[Transliteration, ...]
+    languages: Tuple[str, ...]
+    part_of_speech: Optional[str]
+    noun_type: Optional[str]
+    lexeme: Optional[str]
+    literal_translation: Tuple[Transliteration, ...]
+    practical_translation: Tuple[Transliteration, ...]
+    meaning: Tuple[Transliteration, ...]
+    tags: Tuple[str, ...]
+    related: Tuple[str, ...]
+    references: Tuple[str, ...]
+    uuid: str
+    source_id: Optional[int]
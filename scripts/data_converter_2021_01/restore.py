@@ -0,0 +1,271 @@
+import gzip
+import json
+import re
+import sys
+import tarfile
+from argparse import ArgumentParser
+
+from .compress import open_compressed
+from .graph import (
+    COMMIT_RETRIES,
+    DGRAPH_ADDRESS,
+    apply_indices,
+    close_graph_connection,
+    do_request,
+    drop_indices,
+    graph_is_empty,
+    open_graph_connection,
+)
+from .pipeline import Prefetcher
+from .uidmap import UID_MAP_CAPACITY, UidMap
+
+RESTORE_BATCH_SIZE = 1000
+RESTORE_QUEUE_SIZE = 8
+
+# Predicates and types Dgraph manages itself. Its own exports include them,
+# but a cluster won't let them be altered.
+_RESERVED_SCHEMA = re.compile(
+    r'^\s*(?:<dgraph\.[^>]*>|dgraph\.\S*)\s*:[^\n]*\n?'
+    r'|^\s*type\s+<?dgraph\.[^{]*\{[^}]*\}[^\n]*\n?',
+    re.MULTILINE,
+)
+
+# How the lines of each kind of member are parsed, by file extension.
+restore_formats = {
+    'rdf': 'rdf',
+    'jsonl': 'json',
+    'json': 'json',
+}
+
+
+def get_node_name(token: str):
+    # Returns the name a node goes by in the archive: its blank node in
+    # backups written by backup.py, its UID in Dgraph's own exports.
+    if token.startswith('_:'):
+        return token[2:]
+
+    if token.startswith('<0x') and token.endswith('>'):
+        return token[1:-1]
+
+    return None
+
+
+def map_node(name: str, uids: UidMap, template: str = '<{}>') -> str:
+    # Nodes restored by an earlier batch are referred to by their new UID,
+    # the others stay blank nodes until the batch that creates them commits.
+    uid = uids.get('node', name)
+
+    return template.format(uid) if uid else f'_:{name}'
+
+
+def map_nquad(line: str, uids: UidMap) -> str:
+    subject, predicate, rest = line.split(None, 2)
+    name = get_node_name(subject)
+
+    if name:
+        subject = map_node(name, uids)
+
+    obj = rest.split(None, 1)[0]
+    name = get_node_name(obj)
+
+    if name:
+        rest = map_node(name, uids) + rest[len(obj):]
+
+    return f'{subject} {predicate} {rest}\n'
+
+
+def map_json(value, uids: UidMap):
+    if isinstance(value, list):
+        return [map_json(item, uids) for item in value]
+
+    if isinstance(value, dict):
+        return {
+            key: map_node(item[2:] if item.startswith('_:') else item, uids, '{}')
+            if key == 'uid' else map_json(item, uids)
+            for key, item in value.items()
+        }
+
+    return value
+
+
+def strip_reserved(schema: str) -> str:
+    return _RESERVED_SCHEMA.sub('', schema)
+
+
+def read_lines(stream, kind: str):
+    for line in stream:
+        line = line.decode('utf-8').strip()
+
+        # Dgraph's JSON exports are one array with a node per line.
+        if kind == 'json':
+            line = line.rstrip(',')
+
+            if line in ('[', ']'):
+                continue
+
+        if not line or line.startswith('#'):
+            continue
+
+        yield json.loads(line) if kind == 'json' else line
+
+
+def read_archive(path: str, batch_size: int = RESTORE_BATCH_SIZE):
+    # Reads the archive front to back, as a stream, and yields its schema and
+    # then batches of at most `batch_size` lines from every data member.
+    # Members that were compressed on their own, like the files of a Dgraph
+    # export, are decompressed on the way. Data written before its schema
+    # would get inferred predicate types, so a data member that comes before
+    # any schema is an error.
+    schema_seen = False
+
+    with open_compressed(path) as stream, tarfile.open(fileobj=stream, mode='r|') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+
+            name = member.name
+            stream = archive.extractfile(member)
+
+            if name.endswith('.gz'):
+                stream = gzip.GzipFile(fileobj=stream)
+                name = name[:-3]
+
+            if name.endswith(('.dgraph', '.schema')):
+                yield 'schema', member.name, stream.read().decode('utf-8')
+                schema_seen = True
+                continue
+
+            kind = restore_formats.get(name.rsplit('.', 1)[-1])
+
+            if not kind:
+                print(f'Skipping {member.name}.')
+                continue
+
+            if not schema_seen:
+                raise ValueError(
+                    f'{member.name} comes before any schema in {path}; '
+                    'the schema file must be the first member of the archive'
+                )
+
+            batch = []
+
+            for line in read_lines(stream, kind):
+                batch.append(line)
+
+                if len(batch) >= batch_size:
+                    yield kind, member.name, batch
+                    batch = []
+
+            if batch:
+                yield kind, member.name, batch
+
+
+def commit_batch(client, kind: str, lines: list, uids: UidMap, retries: int = COMMIT_RETRIES):
+    # Blank nodes only live as long as the request that uses them, so the
+    # UIDs Dgraph gives them are kept for the batches that refer to them later.
+    if kind == 'rdf':
+        mutation = {'set_nquads': ''.join(map_nquad(line, uids) for line in lines)}
+    else:
+        mutation = {'set_obj': map_json(lines, uids)}
+
+    def create_request(transaction):
+        return transaction.create_request(mutations=[transaction.create_mutation(**mutation)], commit_now=True)
+
+    response, _, _ = do_request(client, create_request, retries, f'a batch of {len(lines):,} lines')
+    uids.set_many({('node', name): uid for name, uid in response.uids.items()})
+
+
+def restore_archive(
+    client,
+    path: str,
+    batch_size: int = RESTORE_BATCH_SIZE,
+    queue_size: int = RESTORE_QUEUE_SIZE,
+    uid_map_path: str = None,
+):
+    # The archive is decompressed and parsed on its own thread while batches
+    # are committed on this one, with at most `queue_size` batches waiting.
+    # The schema has to come first in the archive (read_archive checks it);
+    # its indexes are only built once every node is in.
+    if not graph_is_empty(client):
+        raise ValueError('Backups can only be restored into an empty graph')
+
+    # Every node can be referred to again until the end of the archive, so
+    # without a file to fall back on, none of them may be evicted. UIDs left
+    # in the file by an earlier restore belong to a graph that's gone now.
+    uids = UidMap(uid_map_path, UID_MAP_CAPACITY if uid_map_path else sys.maxsize)
+    uids.clear()
+    reader = Prefetcher(path, read_archive(path, batch_size), queue_size)
+    indices = None
+    group = None
+    total = 0
+
+    try:
+        for kind, name, batch in reader:
+            if kind == 'schema':
+                indices = strip_reserved(batch)
+                print(f'Applying the schema in {name} without its indexes...')
+                drop_indices(client, indices)
+                continue
+
+            if name.split('/')[0] != group:
+                if group:
+                    print(f'Restored {total:,} lines from {group}.')
+
+                group = name.split('/')[0]
+                total = 0
+
+            commit_batch(client, kind, batch, uids)
+            total += len(batch)
+
+        if group:
+            print(f'Restored {total:,} lines from {group}.')
+    finally:
+        reader.stop()
+        uids.close()
+
+    if indices:
+        apply_indices(client, indices)
+
+    print(
+        f'Decompression waited {reader.producer_wait:.1f}s on Dgraph, '
+        f'Dgraph waited {reader.consumer_wait:.1f}s on decompression.'
+    )
+
+
+def restore(path, addresses=None, batch_size=RESTORE_BATCH_SIZE, uid_map_path=None):
+    stubs, client = open_graph_connection(addresses or (DGRAPH_ADDRESS,))
+
+    try:
+        print(f'Restoring {path} into Dgraph...')
+        restore_archive(client, path, batch_size, uid_map_path=uid_map_path)
+    except Exception as error:
+        print(f'Could not restore "{path}":', error)
+        return 1
+    finally:
+        close_graph_connection(stubs, client)
+
+    return 0
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Stream a backup archive into an empty graph.')
+    parser.add_argument('path', help='archive to restore, e.g. doraboateng.rdf.tar.gz')
+    parser.add_argument(
+        '--alpha',
+        action='append',
+        dest='addresses',
+        help=f'Dgraph alpha address, can be repeated (default: {DGRAPH_ADDRESS})',
+    )
+    parser.add_argument(
+        '--batch-size',
+        default=RESTORE_BATCH_SIZE,
+        type=int,
+        help=f'lines sent to Dgraph per request (default: {RESTORE_BATCH_SIZE:,})',
+    )
+    parser.add_argument(
+        '--uid-map',
+        dest='uid_map_path',
+        help='keep the UIDs of restored nodes in this SQLite file instead of in memory',
+    )
+
+    exit(restore(**vars(parser.parse_args())))
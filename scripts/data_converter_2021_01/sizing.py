@@ -0,0 +1,67 @@
+import time
+from threading import Lock
+
+TARGET_LATENCY = 2.0
+TARGET_ABORT_RATE = 0.1
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 5000
+SIZE_INCREASE = 25
+SIZE_DECREASE = 0.5
+LOG_INTERVAL = 10.0
+
+
+class BatchSizer:
+    # Picks the number of upsert blocks per request the way TCP picks its
+    # window: the size grows by a fixed step after every commit that came
+    # back within the target latency and abort rate, and is halved as soon as
+    # either goes over. Batches built before the last decrease are larger
+    # than the current size, and their commits don't count against it again:
+    # every decrease starts a new generation, and only batches built in the
+    # current one can shrink the size.
+
+    def __init__(
+        self,
+        size: int,
+        target_latency: float = TARGET_LATENCY,
+        target_abort_rate: float = TARGET_ABORT_RATE,
+        min_size: int = MIN_BATCH_SIZE,
+        max_size: int = MAX_BATCH_SIZE,
+    ):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.size = min(max(size, self.min_size), self.max_size)
+        self.target_latency = target_latency
+        self.target_abort_rate = target_abort_rate
+        self.abort_rate = 0.0
+        self.latency = 0.0
+        self.total_increases = 0
+        self.total_decreases = 0
+        self.generation = 0
+        self.logged_at = time.perf_counter()
+        self.lock = Lock()
+
+    def update(self, blocks: int, latency: float, aborts: int, generation: int = None):
+        with self.lock:
+            # Aborts are rare and bursty, so they're smoothed over recent
+            # commits instead of reacting to every single one.
+            self.abort_rate = 0.8 * self.abort_rate + 0.2 * aborts / (aborts + 1)
+            self.latency = latency
+
+            if latency > self.target_latency or self.abort_rate > self.target_abort_rate:
+                if generation is None or generation == self.generation:
+                    self.size = max(self.min_size, int(self.size * SIZE_DECREASE))
+                    self.total_decreases += 1
+                    self.generation += 1
+            elif self.size < self.max_size:
+                self.size = min(self.max_size, self.size + SIZE_INCREASE)
+                self.total_increases += 1
+
+            if time.perf_counter() - self.logged_at >= LOG_INTERVAL:
+                self.log()
+
+    def log(self):
+        self.logged_at = time.perf_counter()
+        print(
+            f'Batch size: {self.size:,} blocks '
+            f'(last commit {self.latency:.2f}s, abort rate {self.abort_rate:.0%}).'
+        )
@@ -0,0 +1,103 @@
+import json
+import os
+import pickle
+from hashlib import sha256
+
+from .jsondump import find_table_files
+
+SNAPSHOT_CHUNK_SIZE = 1000
+
+# Part of every fingerprint, so snapshots pickled before the records changed
+# shape aren't read back. Bump it whenever a record's fields change.
+SNAPSHOT_FORMAT_VERSION = 1
+
+snapshot_tables = ('alphabets', 'expressions', 'languages')
+
+
+def get_fingerprint(*parts) -> str:
+    parts = (SNAPSHOT_FORMAT_VERSION,) + parts
+
+    return sha256(bytes(json.dumps(parts, sort_keys=True, default=str), 'utf-8')).hexdigest()
+
+
+def get_dump_fingerprint(path: str) -> str:
+    # Hashing a multi-gigabyte dump would take about as long as reading it,
+    # so its size and modification time stand in for its contents. Editing a
+    # file in a directory changes neither for the directory itself, so an
+    # extracted JSON dump is fingerprinted by each of its table files.
+    if os.path.isdir(path):
+        tables = {}
+
+        for table, file_path in find_table_files(path).items():
+            stat = os.stat(file_path)
+            tables[table] = (stat.st_size, stat.st_mtime_ns)
+
+        return get_fingerprint(os.path.abspath(path), tables)
+
+    stat = os.stat(path)
+
+    return get_fingerprint(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def get_snapshot_path(directory: str, fingerprint: str, table: str) -> str:
+    return os.path.join(directory, fingerprint, f'{table}.pickle')
+
+
+def iterate_snapshot(path: str):
+    # Each chunk of records was pickled separately, so only one chunk is in
+    # memory at a time.
+    with open(path, 'rb') as snapshot_file:
+        while True:
+            try:
+                records = pickle.load(snapshot_file)
+            except EOFError:
+                return
+
+            yield from records
+
+
+def read_snapshot(directory: str, fingerprint: str):
+    # Returns the records saved for this fingerprint, or None unless every
+    # table was saved in full.
+    paths = {table: get_snapshot_path(directory, fingerprint, table) for table in snapshot_tables}
+
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+
+    data = {table: iterate_snapshot(path) for table, path in paths.items()}
+    data['stories'] = []
+
+    return data
+
+
+def save_records(records, path: str, chunk_size: int = SNAPSHOT_CHUNK_SIZE):
+    # Passes records through while pickling them to a temporary file, which
+    # only takes the snapshot's place once every record has gone by.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    chunk = []
+
+    with open(temp_path, 'wb') as snapshot_file:
+        for record in records:
+            chunk.append(record)
+
+            if len(chunk) >= chunk_size:
+                pickle.dump(chunk, snapshot_file, pickle.HIGHEST_PROTOCOL)
+                chunk = []
+
+            yield record
+
+        if chunk:
+            pickle.dump(chunk, snapshot_file, pickle.HIGHEST_PROTOCOL)
+
+    os.replace(temp_path, path)
+
+
+def write_snapshot(data: dict, directory: str, fingerprint: str) -> dict:
+    result = dict(data)
+
+    for table in snapshot_tables:
+        if table in data:
+            result[table] = save_records(data[table], get_snapshot_path(directory, fingerprint, table))
+
+    return result
@@ -1,22 +1,252 @@
-from .db import fetch_all
-from .graph import load_all
+from argparse import ArgumentParser
 
+from .db import fetch_all, fetch_table_stats, fetch_watermarks
+from .dump import read_all
+from .graph import DGRAPH_ADDRESS, UPSERT_BATCH_SIZE, load_all
+from .journal import JOURNAL_PATH
+from .jsondump import read_json_dump
+from .pipeline import PIPELINE_QUEUE_SIZE, pipeline, report
+from .rdf import write_all
+from .sizing import TARGET_LATENCY
+from .snapshot import get_dump_fingerprint, get_fingerprint, read_snapshot, write_snapshot
+from .uidmap import UID_MAP_CAPACITY
+from .watermarks import read_watermarks, write_watermarks
 
-def sync():
+
+def get_source_fingerprint(dump_path=None, since=None):
+    if dump_path:
+        return get_dump_fingerprint(dump_path)
+
+    stats = fetch_table_stats()
+
+    return get_fingerprint(stats, since) if stats is not None else None
+
+
+def sync(
+    dump_path=None,
+    json_dump_path=None,
+    rdf_path=None,
+    schema_path=None,
+    pipelined=False,
+    queue_size=PIPELINE_QUEUE_SIZE,
+    watermarks_path=None,
+    extract_workers=1,
+    snapshot_dir=None,
+    **load_options,
+):
     print('')
-    print('Fetching data from MariaDB...')
-    data = fetch_all()
+    since = None
+    watermarks = None
+    fingerprint = None
+    data = None
+
+    # The new watermarks are taken before any rows are read, so rows
+    # changed during the sync are read again next time.
+    if watermarks_path and not (dump_path or json_dump_path):
+        since = read_watermarks(watermarks_path)
+        watermarks = fetch_watermarks()
+
+        if not watermarks:
+            return 1
+
+    if snapshot_dir:
+        fingerprint = get_source_fingerprint(dump_path or json_dump_path, since)
+
+        if not fingerprint:
+            return 1
+
+        data = read_snapshot(snapshot_dir, fingerprint)
+
+    if data:
+        print(f'Reading records from snapshot {fingerprint[:12]} in {snapshot_dir}, the source is unchanged.')
+        fingerprint = None
+    elif dump_path:
+        print(f'Reading SQL dump {dump_path}...')
+        data = read_all(dump_path)
+    elif json_dump_path:
+        print(f'Reading JSON dump {json_dump_path}...')
+        data = read_json_dump(json_dump_path)
+    else:
+        print('Connecting to MariaDB...')
+
+        if since:
+            print(f'Only reading rows changed since the watermarks in {watermarks_path}.')
+
+        data = fetch_all(since=since, workers=extract_workers, queue_size=queue_size)
 
     if not data:
         return 1
 
-    print('')
-    print('Loading data into Dgraph...')
-    if not load_all(data):
-        return 1
+    # Records are saved as they stream by, for the next run to start from.
+    if fingerprint:
+        data = write_snapshot(data, snapshot_dir, fingerprint)
+
+    prefetchers = []
+
+    if pipelined or extract_workers > 1:
+        data, prefetchers = pipeline(data, queue_size)
+
+    try:
+        print('')
 
-    return 0
+        if rdf_path:
+            print(f'Writing data to {rdf_path}...')
+            if not write_all(data, rdf_path, schema_path):
+                return 1
+        else:
+            print('Streaming data into Dgraph...')
+            load_options = {key: value for key, value in load_options.items() if value is not None}
+
+            # An incremental sync only reads part of the source.
+            if since:
+                load_options['verify'] = False
+            if not load_all(data, **load_options):
+                return 1
+
+        if watermarks:
+            write_watermarks(watermarks, watermarks_path)
+            print(f'Saved watermarks to {watermarks_path}.')
+
+        return 0
+    finally:
+        for prefetcher in prefetchers:
+            prefetcher.stop()
+
+        if prefetchers:
+            report(prefetchers)
 
 
 if __name__ == '__main__':
-    exit(sync())
+    parser = ArgumentParser(description='Load the 2017 dictionary data into Dgraph.')
+    parser.add_argument(
+        '--dump',
+        dest='dump_path',
+        help='read records straight from a mysqldump file instead of MariaDB',
+    )
+    parser.add_argument(
+        '--json-dump',
+        dest='json_dump_path',
+        help='read records from the 2017 JSON dump, as a tar.gz archive or the directory it was extracted to',
+    )
+    parser.add_argument(
+        '--rdf',
+        dest='rdf_path',
+        help='write gzipped N-Quads to this file instead of loading them into Dgraph',
+    )
+    parser.add_argument(
+        '--schema',
+        dest='schema_path',
+        help='with --rdf, also write a matching Dgraph schema to this file',
+    )
+    parser.add_argument(
+        '--batch-size',
+        default=UPSERT_BATCH_SIZE,
+        type=int,
+        help=f'number of upsert blocks sent to Dgraph per request (default: {UPSERT_BATCH_SIZE})',
+    )
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='start from --batch-size and adjust it to keep commits under --target-latency',
+    )
+    parser.add_argument(
+        '--target-latency',
+        default=TARGET_LATENCY,
+        type=float,
+        help=f'with --adaptive, longest a commit should take in seconds (default: {TARGET_LATENCY})',
+    )
+    parser.add_argument(
+        '--workers',
+        default=1,
+        type=int,
+        help='number of threads committing batches to Dgraph concurrently (default: 1)',
+    )
+    parser.add_argument(
+        '--stubs',
+        dest='stubs_per_address',
+        default=1,
+        type=int,
+        help='number of gRPC client stubs to open per Dgraph alpha (default: 1)',
+    )
+    parser.add_argument(
+        '--alpha',
+        action='append',
+        dest='addresses',
+        help=f'Dgraph alpha address, can be repeated (default: {DGRAPH_ADDRESS})',
+    )
+    parser.add_argument(
+        '--preload',
+        action='store_true',
+        help='fetch the UIDs of existing languages, scripts and transliterations before loading',
+    )
+    parser.add_argument(
+        '--uid-map',
+        dest='uid_map_path',
+        help='SQLite file where node UIDs are kept between runs',
+    )
+    parser.add_argument(
+        '--uid-map-size',
+        dest='uid_map_capacity',
+        default=UID_MAP_CAPACITY,
+        type=int,
+        help=f'number of UIDs kept in memory (default: {UID_MAP_CAPACITY:,})',
+    )
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        dest='pipelined',
+        help='extract and load at the same time, reporting which side waits on the other',
+    )
+    parser.add_argument(
+        '--queue-size',
+        default=PIPELINE_QUEUE_SIZE,
+        type=int,
+        help=f'records buffered per table between extraction and loading (default: {PIPELINE_QUEUE_SIZE:,})',
+    )
+    parser.add_argument(
+        '--extract-workers',
+        default=1,
+        type=int,
+        help='read tables concurrently, and definitions in this many ID ranges, '
+        'over a pool of MariaDB connections (default: 1)',
+    )
+    parser.add_argument(
+        '--snapshot',
+        dest='snapshot_dir',
+        help='directory where extracted records are saved, and read back while the source is unchanged',
+    )
+    parser.add_argument(
+        '--bulk',
+        dest='indices_path',
+        help='load with the indexes in this file (e.g. indices.dgraph) dropped, '
+        'resolving nodes through the UID map, and apply it once done',
+    )
+    parser.add_argument(
+        '--no-verify',
+        action='store_false',
+        dest='verify',
+        help='skip comparing node counts and key digests between the source and the graph',
+    )
+    parser.add_argument(
+        '--journal',
+        dest='journal_path',
+        default=JOURNAL_PATH,
+        help=f'file where committed batches are recorded (default: {JOURNAL_PATH})',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='continue from the last checkpoint in the journal instead of starting over',
+    )
+    parser.add_argument(
+        '--delta',
+        dest='delta_path',
+        help='SQLite file of record content hashes; only records that changed since are written',
+    )
+    parser.add_argument(
+        '--watermarks',
+        dest='watermarks_path',
+        help='JSON file of per-table watermarks; only rows changed since the last sync are read',
+    )
+
+    exit(sync(**vars(parser.parse_args())))
@@ -0,0 +1,115 @@
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+from typing import Union
+
+UID_MAP_CAPACITY = 1000000
+
+
+class UidMap:
+    # Maps (node type, natural key) pairs to Dgraph UIDs. Recently used
+    # entries are kept in memory up to `capacity`; when a path is given,
+    # every entry is also stored in SQLite so later runs can reuse it.
+
+    def __init__(self, path: str = None, capacity: int = UID_MAP_CAPACITY):
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.db = None
+
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS uids ('
+                'node_type TEXT NOT NULL, '
+                'key TEXT NOT NULL, '
+                'uid TEXT NOT NULL, '
+                'PRIMARY KEY (node_type, key)'
+                ') WITHOUT ROWID'
+            )
+            self.db.commit()
+
+    def __len__(self):
+        if self.db:
+            with self.lock:
+                return self.db.execute('SELECT COUNT(*) FROM uids').fetchone()[0]
+
+        return len(self.entries)
+
+    def remember(self, key: tuple, uid: str):
+        self.entries[key] = uid
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def get(self, node_type: str, key_value: str) -> Union[str, None]:
+        key = (node_type, key_value)
+
+        with self.lock:
+            uid = self.entries.get(key)
+
+            if uid:
+                self.entries.move_to_end(key)
+                return uid
+
+            if not self.db:
+                return None
+
+            row = self.db.execute(
+                'SELECT uid FROM uids WHERE node_type = ? AND key = ?',
+                key,
+            ).fetchone()
+
+            if not row:
+                return None
+
+            self.remember(key, row[0])
+
+            return row[0]
+
+    def set(self, node_type: str, key_value: str, uid: str):
+        self.set_many({(node_type, key_value): uid})
+
+    def set_many(self, uids: dict):
+        if not uids:
+            return
+
+        with self.lock:
+            for key, uid in uids.items():
+                self.remember(key, uid)
+
+            if self.db:
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO uids (node_type, key, uid) VALUES (?, ?, ?)',
+                    [(node_type, key_value, uid) for (node_type, key_value), uid in uids.items()],
+                )
+                self.db.commit()
+
+    def sample(self, size: int) -> list:
+        with self.lock:
+            if self.db:
+                return self.db.execute(
+                    'SELECT node_type, key, uid FROM uids ORDER BY RANDOM() LIMIT ?',
+                    (size,),
+                ).fetchall()
+
+            return [
+                (node_type, key_value, uid)
+                for (node_type, key_value), uid in list(self.entries.items())[-size:]
+            ]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+            if self.db:
+                self.db.execute('DELETE FROM uids')
+                self.db.commit()
+
+    def close(self):
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
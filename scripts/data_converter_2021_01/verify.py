@@ -0,0 +1,42 @@
+from hashlib import sha256
+
+VERIFY_PAGE_SIZE = 10000
+
+_DIGEST_MODULUS = 2 ** 256
+
+
+class KeyDigest:
+    # Summarizes a set of natural keys as their count and the sum of their
+    # hashes, which doesn't depend on the order keys are added in. Both sides
+    # of a comparison can then be computed page by page, in whatever order
+    # MariaDB and Dgraph return them, without holding the keys in memory.
+
+    def __init__(self, keys=()):
+        self.count = 0
+        self.total = 0
+
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        self.count += 1
+        self.total = (self.total + int.from_bytes(sha256(bytes(str(key), 'utf-8')).digest(), 'big')) \
+            % _DIGEST_MODULUS
+
+    def __eq__(self, other):
+        return self.count == other.count and self.total == other.total
+
+    def __str__(self):
+        return f'{self.count:,} keys, digest {format(self.total, "064x")[:12]}'
+
+
+def watch_keys(records, digest: KeyDigest, get_key):
+    # Adds the key of every record streaming past to `digest`. Records whose
+    # key is None aren't loaded and aren't counted.
+    for record in records:
+        key = get_key(record)
+
+        if key is not None:
+            digest.add(key)
+
+        yield record
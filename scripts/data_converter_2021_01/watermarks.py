@@ -0,0 +1,25 @@
+import json
+import os
+
+WATERMARKS_PATH = 'sync-watermarks.json'
+
+
+def read_watermarks(path: str = WATERMARKS_PATH):
+    # Returns the watermarks saved by the last successful sync, or None when
+    # there aren't any yet and every table has to be read in full.
+    if not os.path.exists(path):
+        return None
+
+    with open(path, encoding='utf-8') as watermarks_file:
+        return json.load(watermarks_file)
+
+
+def write_watermarks(watermarks: dict, path: str = WATERMARKS_PATH):
+    # The file is replaced in one go, so a sync that dies while saving it
+    # leaves the previous watermarks in place.
+    temp_path = f'{path}.tmp'
+
+    with open(temp_path, 'w', encoding='utf-8') as watermarks_file:
+        json.dump(watermarks, watermarks_file, indent=2, sort_keys=True)
+
+    os.replace(temp_path, path)